@@ -0,0 +1,200 @@
+"""
+This module provides an archive of raw AIMS responses, so that pages can be
+parsed again without downloading them from AIMS:
+
+Archive - compressed, content addressed store of responses
+rebuild_trip_cache - rebuild a TripCache from archived trip sheets
+"""
+
+import typing as T
+import os
+import gzip
+import json
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import time
+import requests
+
+from aimslib.access.connect import PostFunc
+from aimslib.access.cache import TripCache, FetchInfo, _file_mode
+from aimslib.common.types import (
+    TripID, NoTripDetails, BadTripDetails, BadAIMSSector, BadAIMSDuty)
+import aimslib.access.trip as Trip
+
+
+#Only responses from these pages are archived; the rest (e.g. logout) are of
+#no use for reparsing.
+ARCHIVED_URLS = ("perinfo.exe/schedule", "perinfo.exe/getlegmem",
+                 "fltinfo.exe/AjAction")
+
+
+class ArchiveEntry(T.NamedTuple):
+    rel_url: str
+    data: T.Dict[str, str]
+    digest: str
+    fetched: float
+
+
+class Archive:
+    """A store of raw AIMS responses.
+
+    :param directory: The directory in which to keep the archive.
+
+    Each distinct response body is stored once, gzip compressed, in a file
+    named by the SHA-256 digest of its content. An SQLite index records the
+    relative url and request data of every archived request, along with the
+    digest of the response and the time it was fetched.
+
+    The archive may be used from several threads at once, e.g. by a wrapped
+    post function under TripCache.prefetch. The index connection is shared
+    between threads, with access serialised by a lock.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), timeout=30,
+            check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "rel_url TEXT NOT NULL, data TEXT NOT NULL, "
+                "digest TEXT NOT NULL, fetched REAL NOT NULL)")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS request "
+                "ON responses (rel_url, data)")
+
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2],
+                            digest + ".gz")
+
+
+    def put(self, rel_url: str, data: T.Dict[str, str], text: str) -> str:
+        """Archive a response.
+
+        :param rel_url: The relative url passed to the post function.
+        :param data: The data dictionary passed to the post function.
+        :param text: The text of the response.
+
+        :return: The digest of text.
+        """
+        content = text.encode()
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            #a unique temporary file, since another thread or process may be
+            #archiving the same content
+            fd, tmp_path = tempfile.mkstemp(
+                suffix=".tmp", dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f, gzip.GzipFile(
+                        fileobj=f, mode="wb") as gz:
+                    gz.write(content)
+                os.chmod(tmp_path, _file_mode(path))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?)",
+                (rel_url, _canonical(data), digest, time.time()))
+        return digest
+
+
+    def text(self, digest: str) -> str:
+        """Return the archived response with the given digest."""
+        with gzip.open(self._path(digest), "rb") as f:
+            return f.read().decode()
+
+
+    def latest(self, rel_url: str, data: T.Dict[str, str]
+    ) -> T.Optional[str]:
+        """Return the most recently archived response to a request, or None
+        if the request has not been archived."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT digest FROM responses WHERE rel_url = ? AND data = ? "
+                "ORDER BY fetched DESC LIMIT 1",
+                (rel_url, _canonical(data))).fetchone()
+        return self.text(row[0]) if row else None
+
+
+    def entries(self, rel_url: T.Optional[str] = None
+    ) -> T.Iterator[ArchiveEntry]:
+        """Iterate over index entries, oldest first.
+
+        :param rel_url: If given, only entries for this relative url.
+        """
+        query = "SELECT rel_url, data, digest, fetched FROM responses"
+        params: T.Tuple[str, ...] = ()
+        if rel_url is not None:
+            query += " WHERE rel_url = ?"
+            params = (rel_url,)
+        with self.lock:
+            rows = self.conn.execute(
+                query + " ORDER BY fetched", params).fetchall()
+        for url, data, digest, fetched in rows:
+            yield ArchiveEntry(url, json.loads(data), digest, fetched)
+
+
+    def wrap(self, post: PostFunc) -> PostFunc:
+        """Wrap a post function so that responses are archived.
+
+        :param post: The function returned from connect.
+
+        :return: A function with the same signature as post that archives
+            the responses from ARCHIVED_URLS before returning them.
+        """
+        def archiving_post(rel_url: str, data: T.Dict[str, str]
+        ) -> requests.Response:
+            request_data = dict(data) #post may modify data
+            r = post(rel_url, data)
+            if rel_url in ARCHIVED_URLS:
+                self.put(rel_url, request_data, r.text)
+            return r
+        return archiving_post
+
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+def _canonical(data: T.Dict[str, str]) -> str:
+    return json.dumps({K: str(V) for K, V in data.items()}, sort_keys=True)
+
+
+def rebuild_trip_cache(archive: Archive, trip_cache: TripCache) -> int:
+    """Rebuild a TripCache from archived trip sheets without using the network.
+
+    :param archive: The archive containing the trip sheets.
+    :param trip_cache: The cache to populate. Existing entries for archived
+        trips are replaced by the result of parsing the most recent archived
+        trip sheet.
+
+    :return: The number of trips added to the cache.
+
+    Trip sheets that cannot be parsed are skipped.
+    """
+    latest: T.Dict[TripID, ArchiveEntry] = {}
+    for entry in archive.entries("perinfo.exe/schedule"):
+        if "FltInf" not in entry.data: continue #a brief roster
+        trip_id = TripID(entry.data["ORGDAY"], entry.data["CROUTE"])
+        latest[trip_id] = entry #entries are oldest first
+    count = 0
+    for trip_id, entry in sorted(latest.items()):
+        try:
+            trip_cache.cache[trip_id] = Trip.duties(
+                Trip.parse(archive.text(entry.digest)), trip_id)
+        except (NoTripDetails, BadTripDetails, BadAIMSSector, BadAIMSDuty):
+            continue
+        trip_cache.fetch_info[trip_id] = FetchInfo(entry.digest, entry.fetched)
+        count += 1
+    return count
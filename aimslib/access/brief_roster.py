@@ -1,11 +1,14 @@
 from bs4 import BeautifulSoup #type: ignore
-from typing import List, NamedTuple, Tuple, Generator
+from typing import (
+    List, NamedTuple, Tuple, Generator, AsyncGenerator, Optional)
 import datetime as DT
 
-from aimslib.access.connect import PostFunc
+from aimslib.access.connect import PostFunc, AsyncPostFunc
 from aimslib.common.types import (
     Duty, TripID, Sector, SectorFlags,
     BadBriefRoster, BadRosterEntry)
+import aimslib.common.times as times
+from aimslib.common.htmlparse import StackParser
 
 
 DEFAULT_FILTER = ["==>", "D/O", "D/OR", "WD/O", "P/T", "LVE", "FTGD",
@@ -47,10 +50,34 @@ def retrieve(post: PostFunc, count: int = 0) -> Generator[str, None, None]:
         yield r.text
 
 
-def parse(html: str) -> List[RosterEntry]:
+async def async_retrieve(post: AsyncPostFunc, count: int = 0
+) -> AsyncGenerator[str, None]:
+    """Asyncio version of retrieve.
+
+    :param post: Coroutine function returned from connect.async_connect()
+    :param count: The number of rosters to access, as for retrieve.
+
+    :yields: html string containing the requested brief roster
+    """
+    direc = "2" #forwards
+    if count < 0:
+        count = -count
+        direc = "1" #backwards
+    r = await post("perinfo.exe/schedule", {})
+    yield r.text
+    while(count):
+        count -= 1
+        r = await post("perinfo.exe/schedule", {"Direc": direc,  "_flagy": "2"})
+        yield r.text
+
+
+def parse(html: str, backend: str = "fast") -> List[RosterEntry]:
     """Convert an HTML brief roster to a list of roster entries.
 
     :param html: The HTML of an AIMS Brief Roster
+    :param backend: "fast" to use parse_stream, or "bs4" to use BeautifulSoup.
+        Both produce identical output; the BeautifulSoup version is retained
+        as a reference implementation.
 
     :return: A list of RosterEntry objects. A RosterEntry object is a tuple
         consisting of an aims_day and a list of strings. An aims_day is an
@@ -83,6 +110,13 @@ def parse(html: str) -> List[RosterEntry]:
     day's trip crosses midnight.
 
     """
+    assert backend in ("fast", "bs4")
+    if backend == "fast":
+        return list(parse_stream(html))
+    return _parse_bs4(html)
+
+
+def _parse_bs4(html: str) -> List[RosterEntry]:
     soup = BeautifulSoup(html, "html.parser")
     main_div = soup.find("div", id="main_div")
     if not main_div: raise BadBriefRoster
@@ -99,6 +133,108 @@ def parse(html: str) -> List[RosterEntry]:
     return roster_entries
 
 
+class _RosterParser(StackParser):
+    """Event driven parser that finds duties_table tables in main_div.
+
+    Entries are appended to self.entries in document order as the start
+    tag of each table is found, and are complete once self.open_tables no
+    longer contains their index. Each element is stored on the stack with
+    its attributes and the index of its entry, or None if it is not a
+    duties_table.
+    """
+
+    def __init__(self):
+        StackParser.__init__(self)
+        self.main_div_depth: Optional[int] = None
+        self.main_div_found = False
+        self.entries: List[Tuple[str, List[str]]] = []
+        self.open_tables: List[int] = []
+        self.text: List[str] = []
+
+
+    def _flush_text(self):
+        if self.text and self.open_tables:
+            string = "".join(self.text).strip()
+            if string:
+                for c in self.open_tables:
+                    self.entries[c][1].append(string)
+        self.text = []
+
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        StackParser.handle_starttag(self, tag, attrs)
+
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        StackParser.handle_endtag(self, tag)
+
+
+    def start_element(self, tag, attrs):
+        attrs = dict(attrs)
+        index = None
+        if (not self.main_div_found and tag == "div"
+            and attrs.get("id") == "main_div"):
+            self.main_div_found = True
+            self.main_div_depth = len(self.stack)
+        elif (self.main_div_depth is not None and tag == "table" and
+              "duties_table" in (attrs.get("class") or "").split()):
+            parent_attrs = self.stack[-1][1][0]
+            if parent_attrs.get("id") is None: raise BadBriefRoster
+            index = len(self.entries)
+            self.entries.append(
+                (parent_attrs["id"].replace("myday_", ""), []))
+            self.open_tables.append(index)
+        return (attrs, index)
+
+
+    def end_elements(self, values, depth):
+        for _, index in values:
+            if index is not None: self.open_tables.remove(index)
+        if self.main_div_depth is not None and depth <= self.main_div_depth:
+            self.main_div_depth = None
+
+
+    def handle_data(self, data):
+        #text may be delivered in pieces, so join before stripping
+        self.text.append(data)
+
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+
+def parse_stream(html: str, chunk_size: int = 16384
+) -> Generator[RosterEntry, None, None]:
+    """Event driven version of parse.
+
+    :param html: The HTML of an AIMS Brief Roster
+    :param chunk_size: The number of characters fed to the parser between
+        checks for completed entries.
+
+    :yields: RosterEntry objects in the same order as parse, each one as
+        soon as the end of its table has been parsed.
+
+    :raises BadBriefRoster: As for parse. Entries preceding the problem
+        may already have been yielded.
+    """
+    parser = _RosterParser()
+    yielded = 0
+    for c in range(0, len(html), chunk_size):
+        parser.feed(html[c:c + chunk_size])
+        while (yielded < len(parser.entries) and
+               (not parser.open_tables or yielded < parser.open_tables[0])):
+            aims_day, strings = parser.entries[yielded]
+            yield RosterEntry(aims_day, tuple(strings))
+            yielded += 1
+    parser.close()
+    parser._flush_text()
+    if not parser.entries: raise BadBriefRoster
+    for aims_day, strings in parser.entries[yielded:]:
+        yield RosterEntry(aims_day, tuple(strings))
+
+
 def duties(entries: List[RosterEntry], filter_: List[str]=DEFAULT_FILTER
 ) -> List[Duty]:
     """Convert a list of RosterEntry objects into a list of Duty objects.
@@ -123,11 +259,9 @@ def duties(entries: List[RosterEntry], filter_: List[str]=DEFAULT_FILTER
             if p in filter_: continue
             if ":" in p: #possibly found a time
                 if len(items) < 2: raise BadRosterEntry
-                try:
-                    end_time = DT.datetime.strptime(p, "%H:%M").time()
-                    p = items.pop()
-                    start_time = DT.datetime.strptime(p, "%H:%M").time()
-                except ValueError: #raised by strptime if bad format
+                end_time = times.hm(p)
+                start_time = times.hm(items.pop())
+                if end_time is None or start_time is None:
                     raise BadRosterEntry
                 text = items.pop()
                 date = (DT.datetime(1980, 1, 1) +
@@ -1,50 +1,499 @@
 import pickle
-from typing import List, Dict
+import sqlite3
+import tempfile
+import contextlib
+from typing import (
+    List, Dict, Set, Iterable, Hashable, Iterator, Callable, Any,
+    MutableMapping, NamedTuple)
 import os
+import stat
+import time
+import hashlib
 import datetime as DT
+import concurrent.futures
+try:
+    import fcntl
+except ImportError: #not available on Windows; files will not be locked
+    fcntl = None # type: ignore
 
 from aimslib.access.connect import PostFunc
 from aimslib.common.types import TripID, Duty, CrewMember, SectorFlags
 import aimslib.access.trip as Trip
 import aimslib.access.crew as Crew
 
+
+class SqliteStore(MutableMapping[Any, Any]):
+    """A dictionary-like object that stores pickled values in an SQLite table.
+
+    :param filename: The SQLite database file.
+    :param table: The name of the table to use within the database.
+    :param encode_key: Function to convert a key to a string.
+    :param decode_key: Function to convert a string back into a key.
+
+    Every assignment or deletion is committed immediately, so entries that
+    have been stored survive a crash. Lookups use the table's primary key
+    index, so only the requested entry is loaded.
+    """
+
+    def __init__(self, filename: str, table: str,
+                 encode_key: Callable[[Any], str] = str,
+                 decode_key: Callable[[str], Any] = str) -> None:
+        self.table = table
+        self.encode_key = encode_key
+        self.decode_key = decode_key
+        try:
+            self._connect(filename)
+        except sqlite3.DatabaseError as err:
+            if isinstance(err, sqlite3.OperationalError): raise #e.g. locked
+            #file is corrupt, so move it aside and start again
+            self.conn.close()
+            os.replace(filename, filename + ".corrupt")
+            self._connect(filename)
+
+
+    def _connect(self, filename: str) -> None:
+        #sqlite handles locking between processes; wait for other writers
+        self.conn = sqlite3.connect(filename, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+
+
+    def __getitem__(self, key: Any) -> Any:
+        row = self.conn.execute(
+            f"SELECT value FROM {self.table} WHERE key = ?",
+            (self.encode_key(key),)).fetchone()
+        if row is None: raise KeyError(key)
+        return pickle.loads(row[0])
+
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        with self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                (self.encode_key(key), pickle.dumps(value)))
+
+
+    def __delitem__(self, key: Any) -> None:
+        with self.conn:
+            cur = self.conn.execute(
+                f"DELETE FROM {self.table} WHERE key = ?",
+                (self.encode_key(key),))
+        if not cur.rowcount: raise KeyError(key)
+
+
+    def __contains__(self, key: object) -> bool:
+        return self.conn.execute(
+            f"SELECT 1 FROM {self.table} WHERE key = ?",
+            (self.encode_key(key),)).fetchone() is not None
+
+
+    def __iter__(self) -> Iterator[Any]:
+        for (key,) in self.conn.execute(f"SELECT key FROM {self.table}"):
+            yield self.decode_key(key)
+
+
+    def __len__(self) -> int:
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        """As for dict.update, but committed as a single transaction."""
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                ((self.encode_key(K), pickle.dumps(V))
+                 for K, V in dict(*args, **kwargs).items()))
+
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class _TrackedDict(Dict[Any, Any]):
+    """A dict that records the keys assigned to or deleted since it was
+    created or last reset, so that another process's changes to the other
+    keys are not overwritten when the pickle backend merges caches."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        dict.__init__(self, *args, **kwargs)
+        self.reset()
+
+
+    def reset(self) -> None:
+        self.changed: Set[Any] = set()
+        self.deleted: Set[Any] = set()
+
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        dict.__setitem__(self, key, value)
+        self.changed.add(key)
+        self.deleted.discard(key)
+
+
+    def __delitem__(self, key: Any) -> None:
+        dict.__delitem__(self, key)
+        self.deleted.add(key)
+        self.changed.discard(key)
+
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        if key in self:
+            self.deleted.add(key)
+            self.changed.discard(key)
+        return dict.pop(self, key, *default)
+
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self: self[key] = default
+        return self[key]
+
+
+    def update(self, *args: Any, **kwargs: Any) -> None: #type: ignore
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+
+    def merge(self, persisted: Dict[Any, Any]) -> "_TrackedDict":
+        """Apply the recorded changes to persisted.
+
+        :return: A new _TrackedDict with the merged contents and no recorded
+            changes.
+        """
+        for key in self.deleted:
+            persisted.pop(key, None)
+        for key in self.changed:
+            persisted[key] = dict.__getitem__(self, key)
+        return _TrackedDict(persisted)
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+
+
+class FetchInfo(NamedTuple):
+    """Information about the last download of a cached page.
+
+    :var digest: SHA-256 hex digest of the html.
+    :var fetched: Time of the download, in seconds since the epoch.
+    """
+    digest: str
+    fetched: float
+
+
 class Cache:
+    """Base class for caches of parsed AIMS pages.
+
+    :param filename: The file in which the cache is persisted.
+    :param post: Function to call for sending requests to AIMS
+    :param backend: "pickle" to load the whole cache from a pickle file and
+        write it back with store(), or "sqlite" to keep it in an SQLite
+        database, with each entry written as soon as it is cached.
+    :param max_entries: If non-zero, evict() removes least recently used
+        entries until no more than this many remain.
+    :param max_age: If non-zero, evict() removes entries whose AIMS day is
+        more than this many days before today.
+
+    Recency of use is only tracked in memory, so entries that have not been
+    used since the cache was opened are evicted first, oldest AIMS day first.
+
+    Subclasses may record a FetchInfo object for each key in self.fetch_info.
+    This is persisted alongside the cache, in a sidecar file with suffix
+    ".meta" for the pickle backend or a separate table for the sqlite
+    backend.
+    """
 
-    def __init__(self, filename:str, post: PostFunc):
+    TABLE = "cache"
+
+    def __init__(self, filename:str, post: PostFunc, backend: str = "pickle",
+                 max_entries: int = 0, max_age: int = 0):
+        assert backend in ("pickle", "sqlite")
+        assert max_entries >= 0 and max_age >= 0
         self.pickle_file = filename
         self.post_func = post
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.prefetched: Dict[Hashable, str] = {}
+        self.last_access: Dict[Hashable, float] = {}
+        self.hits, self.misses, self.evictions = 0, 0, 0
         try:
             os.mkdir(os.path.dirname(filename))
         except FileExistsError:
             pass
-        try:
-            with open(filename, "rb") as f:
-                self.cache = pickle.load(f)
-        except OSError:
-            pass #empty cache will be used
+        if backend == "sqlite":
+            self.cache = SqliteStore(
+                filename, self.TABLE, self._encode_key, self._decode_key)
+            self.fetch_info: MutableMapping[Any, FetchInfo] = SqliteStore(
+                filename, self.TABLE + "_meta",
+                self._encode_key, self._decode_key)
+            return
+        self.cache = _TrackedDict(_load_pickle(filename))
+        self.fetch_info = _TrackedDict(_load_pickle(filename + ".meta"))
 
 
     def store(self):
-        with open(self.pickle_file, "wb") as f:
-            pickle.dump(self.cache, f)
+        """Persist the cache.
+
+        For the pickle backend, the file is locked and reloaded, so that it
+        includes the changes made by any other process since it was loaded.
+        Only the entries that this process has added, replaced or removed are
+        then applied to it, and the result is written to a temporary file
+        that is renamed over the original. A crash during store() thus leaves
+        the previous file intact.
+
+        Eviction is carried out before the cache is persisted.
+        """
+        if self.backend == "sqlite":
+            self.evict()
+            return #entries are committed as they are added
+        meta_file = self.pickle_file + ".meta"
+        with _locked(self.pickle_file):
+            self.cache = self.cache.merge(_load_pickle(self.pickle_file))
+            self.fetch_info = self.fetch_info.merge(_load_pickle(meta_file))
+            self.evict()
+            _write_pickle(self.pickle_file, dict(self.cache))
+            if self.fetch_info or os.path.exists(meta_file):
+                _write_pickle(meta_file, dict(self.fetch_info))
+            self.cache.reset()
+            self.fetch_info.reset()
+
+
+    def evict(self) -> int:
+        """Remove entries according to max_age and max_entries.
+
+        :return: The number of entries evicted.
+        """
+        if not (self.max_age or self.max_entries): return 0
+        keys = list(self.cache)
+        evicted = []
+        if self.max_age:
+            today = (DT.date.today() - DT.date(1980, 1, 1)).days
+            cutoff = today - self.max_age
+            evicted = [X for X in keys if self._aims_day(X) < cutoff]
+            keys = [X for X in keys if self._aims_day(X) >= cutoff]
+        if self.max_entries and len(keys) > self.max_entries:
+            keys.sort(key=lambda X: (self.last_access.get(X, 0.0),
+                                     self._aims_day(X)))
+            evicted += keys[:len(keys) - self.max_entries]
+        for key in evicted:
+            del self.cache[key]
+            self.fetch_info.pop(key, None)
+            self.last_access.pop(key, None)
+        self.evictions += len(evicted)
+        return len(evicted)
+
+
+    def stats(self) -> CacheStats:
+        """Return the hit, miss and eviction counts since the cache was
+        opened, and the current number of entries."""
+        return CacheStats(self.hits, self.misses, self.evictions,
+                          len(self.cache))
+
+
+    def _touch(self, key: Hashable, hit: bool) -> None:
+        self.last_access[key] = time.monotonic()
+        if hit: self.hits += 1
+        else: self.misses += 1
+
+
+    def _aims_day(self, key: Any) -> int:
+        raise NotImplementedError
+
+
+    def import_pickle(self, filename: str) -> int:
+        """Copy the entries of a pickle file cache into this cache.
+
+        :param filename: A cache file written by the pickle backend. Its
+            ".meta" sidecar file, if any, is imported too.
+
+        :return: The number of entries imported.
+
+        This provides a migration path from the pickle backend to the sqlite
+        backend. A missing or corrupt file is treated as an empty cache. With
+        the sqlite backend, the entries are committed as a single
+        transaction.
+        """
+        old_cache = _load_pickle(filename)
+        self.cache.update(old_cache)
+        self.fetch_info.update(_load_pickle(filename + ".meta"))
+        return len(old_cache)
+
+
+    def close(self) -> None:
+        """Close the database connections of the sqlite backend."""
+        if self.backend == "sqlite":
+            self.cache.close() #type: ignore
+            self.fetch_info.close() #type: ignore
+
+
+    def _encode_key(self, key: Any) -> str:
+        return str(key)
+
+
+    def _decode_key(self, key: str) -> Any:
+        return key
+
+
+    def prefetch(self, keys: Iterable[Hashable], max_workers: int) -> None:
+        """Concurrently download the html for keys that are not cached.
+
+        :param keys: The keys that are about to be requested.
+        :param max_workers: The maximum number of requests in flight at once.
+
+        The downloaded html is held until the key is requested, at which point
+        it is parsed and cached in the normal way. Exceptions raised by the
+        underlying requests are propagated.
+        """
+        misses = [X for X in dict.fromkeys(keys)
+                  if X not in self.prefetched and self._fetch_needed_p(X)]
+        if not misses: return
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            for key, html in zip(misses, executor.map(self._retrieve, misses)):
+                self.prefetched[key] = html
+
+
+    def _html(self, key: Hashable) -> str:
+        html = self.prefetched.pop(key, None)
+        if html is None:
+            html = self._retrieve(key)
+        return html
+
+
+    def _fetch_needed_p(self, key: Hashable) -> bool:
+        raise NotImplementedError
+
+
+    def _retrieve(self, key: Hashable) -> str:
+        raise NotImplementedError
+
+
+def _load_pickle(filename: str) -> Dict[Any, Any]:
+    """Load a pickled cache dictionary, treating a missing or corrupt file as
+    an empty cache."""
+    try:
+        with open(filename, "rb") as f:
+            cache = pickle.load(f)
+    #a corrupt pickle can raise almost anything, e.g. MemoryError if a
+    #length field is damaged
+    except Exception:
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _file_mode(filename: str) -> int:
+    """Return the permissions of filename, or if it does not exist, the
+    permissions that open() would give a new file."""
+    try:
+        return stat.S_IMODE(os.stat(filename).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def _write_pickle(filename: str, obj: Any) -> None:
+    """Atomically replace filename with a pickle of obj.
+
+    The permissions of the file are preserved. mkstemp creates files that
+    only the owner can read, so they are changed before the rename.
+    """
+    fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(filename) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(obj, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_filename, _file_mode(filename))
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        os.unlink(tmp_filename)
+        raise
+
+
+@contextlib.contextmanager
+def _locked(filename: str) -> Iterator[None]:
+    """Hold an exclusive lock on filename + ".lock" for the duration."""
+    if fcntl is None:
+        yield
+        return
+    with open(filename + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
 class TripCache(Cache):
+    """Cache of trip sheets, keyed by TripID.
 
-    def __init__(self, filename:str, post:PostFunc):
-        self.cache: Dict[str, List[Duty]] = {}
-        Cache.__init__(self, filename,  post)
+    :param refresh_interval: Minimum number of seconds between downloads of
+        a cached trip that still needs refreshing. Zero means download it
+        every time it is requested.
+
+    Other parameters are as for Cache. If a refreshed trip sheet is
+    identical to the one previously downloaded, it is not parsed again and
+    the cached duties are left untouched.
+    """
+
+    TABLE = "trips"
+
+    def __init__(self, filename:str, post:PostFunc, backend: str = "pickle",
+                 max_entries: int = 0, max_age: int = 0,
+                 refresh_interval: float = 0):
+        self.cache: MutableMapping[TripID, List[Duty]] = {}
+        self.refresh_interval = refresh_interval
+        Cache.__init__(self, filename,  post, backend, max_entries, max_age)
 
 
     def trip(self, trip_id: TripID) -> List[Duty]:
-        if trip_id not in self.cache or self.needs_refresh_p(trip_id):
-            self.cache[trip_id] = (
-                Trip.duties(
-                    Trip.parse(
-                        Trip.retrieve(self.post_func, trip_id)), trip_id))
+        fetch_needed = self._fetch_needed_p(trip_id)
+        if fetch_needed:
+            html = self._html(trip_id)
+            digest = hashlib.sha256(html.encode()).hexdigest()
+            info = self.fetch_info.get(trip_id)
+            if (trip_id not in self.cache or
+                info is None or info.digest != digest):
+                self.cache[trip_id] = (
+                    Trip.duties(Trip.parse(html), trip_id))
+            self.fetch_info[trip_id] = FetchInfo(digest, time.time())
+        self._touch(trip_id, not fetch_needed)
         return self.cache[trip_id]
 
 
+    def _fetch_needed_p(self, trip_id: TripID) -> bool:
+        if trip_id not in self.cache: return True
+        if not self.needs_refresh_p(trip_id): return False
+        if self.refresh_interval:
+            info = self.fetch_info.get(trip_id)
+            if info and time.time() - info.fetched < self.refresh_interval:
+                return False #refreshed recently enough
+        return True
+
+
+    def _retrieve(self, trip_id: TripID) -> str:
+        return Trip.retrieve(self.post_func, trip_id)
+
+
+    def _encode_key(self, trip_id: TripID) -> str:
+        aims_day, trip = trip_id
+        return f"{aims_day}/{trip}"
+
+
+    def _decode_key(self, key: str) -> TripID:
+        return TripID(*key.split("/", 1))
+
+
+    def _aims_day(self, trip_id: TripID) -> int:
+        return int(trip_id[0])
+
+
     def needs_refresh_p(self, trip_id: TripID) -> bool:
         all_actuals_recorded = True
         duty_list = self.cache[trip_id]
@@ -67,15 +516,20 @@ class TripCache(Cache):
 
 class CrewlistCache(Cache):
 
-    def __init__(self, filename:str, post: PostFunc):
-        self.cache: Dict[str, List[CrewMember]] = {}
-        Cache.__init__(self, filename, post)
+    TABLE = "crewlists"
+
+    def __init__(self, filename:str, post: PostFunc, backend: str = "pickle",
+                 max_entries: int = 0, max_age: int = 0):
+        self.cache: MutableMapping[str, List[CrewMember]] = {}
+        Cache.__init__(self, filename, post, backend, max_entries, max_age)
 
 
     def crewlist(self, crewlistID: str) -> List[CrewMember]:
-        if crewlistID in self.cache:
+        hit = crewlistID in self.cache
+        self._touch(crewlistID, hit)
+        if hit:
             return self.cache[crewlistID]
-        crewlist = Crew.crewlist(Crew.retrieve(self.post_func, crewlistID))
+        crewlist = Crew.crewlist(self._html(crewlistID))
         #first part of identifier is an AIMS data (days since 1980-01-01)
         aims_date = crewlistID.split(",", 1)[0]
         date = DT.date(1980, 1, 1) + DT.timedelta(days=int(aims_date))
@@ -83,3 +537,15 @@ class CrewlistCache(Cache):
         if DT.date.today() - date > DT.timedelta(days=2):
             self.cache[crewlistID] = crewlist
         return crewlist
+
+
+    def _fetch_needed_p(self, crewlistID: str) -> bool:
+        return crewlistID not in self.cache
+
+
+    def _retrieve(self, crewlistID: str) -> str:
+        return Crew.retrieve(self.post_func, crewlistID)
+
+
+    def _aims_day(self, crewlistID: str) -> int:
+        return int(crewlistID.split(",", 1)[0])
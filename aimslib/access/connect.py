@@ -5,6 +5,9 @@ This module provides basic functions for access to AIMS server:
 connect - for connecting to an AIMS server
 logout - for logging out of an AIMS server
 changes - for checking for changes notification
+async_connect - for connecting to an AIMS server from asyncio code
+async_logout - for logging out of an AIMS server from asyncio code
+rate_limited - for throttling requests sent to an AIMS server
 """
 
 import typing as T
@@ -12,13 +15,29 @@ import requests
 import base64
 import hashlib
 import os
+import threading
+import time
 
 import aimslib.common.types as AT
 
 
 REQUEST_TIMEOUT = os.getenv("AIMS_TIMEOUT") or 60
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:86.0) "
+              "Gecko/20100101 Firefox/86.0")
+
+
+class AsyncResponse(T.NamedTuple):
+    """The parts of an AIMS response that are of interest.
+
+    :var url: The final url of the response, after any redirects.
+    :var text: The decoded body of the response.
+    """
+    url: str
+    text: str
+
 
 PostFunc = T.Callable[[str, T.Dict[str, str]], requests.Response]
+AsyncPostFunc = T.Callable[[str, T.Dict[str, str]], T.Awaitable[AsyncResponse]]
 HeartbeatFunc = T.Optional[T.Callable[[], None]]
 
 def _check_response(r: requests.Response, *args, **kwargs) -> None:
@@ -95,14 +114,109 @@ def connect(server_url: str, username:str, pw:str, hb: HeartbeatFunc = None
     the ecrew server. The returned session and base url allow access to other
     AIMS pages.
     """
+    session = _session()
+    encoded_id, encoded_pw = _encode_credentials(username, pw)
+    post_func = _login(session, server_url, encoded_id, encoded_pw, hb)
+    del pw #for ease of auditing
+    return post_func
+
+
+def _session() -> requests.Session:
+    """Create a requests Session set up for use with AIMS."""
     session = requests.Session()
     session.hooks['response'].append(_check_response)
-    session.headers.update({
-        "User-Agent":
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:86.0) Gecko/20100101 Firefox/86.0"})
-    encoded_id = base64.b64encode(username.encode()).decode()
-    encoded_pw = hashlib.md5(pw.encode()).hexdigest()
-    post_func = _login(session, server_url, encoded_id, encoded_pw, hb)
+    session.headers.update({"User-Agent": USER_AGENT})
+    return session
+
+
+def _encode_credentials(username: str, pw: str) -> T.Tuple[str, str]:
+    """Encode username and password in the form sent by the AIMS login page."""
+    return (base64.b64encode(username.encode()).decode(),
+            hashlib.md5(pw.encode()).hexdigest())
+
+
+async def _async_login(
+        session: T.Any,
+        server_url:str,
+        enc_username:str,
+        enc_password:str,
+        heartbeat: HeartbeatFunc,
+        timeout: T.Any,
+        recurse: bool = True
+) -> AsyncPostFunc:
+    """Asyncio version of _login.
+
+    :param session: aiohttp ClientSession object to use for logon.
+    :param timeout: aiohttp ClientTimeout object used for every request.
+
+    Other parameters are as for _login.
+    """
+    async def request(method: str, url: str, **kwargs) -> AsyncResponse:
+        async with session.request(
+                method, url, timeout=timeout,
+                headers={"User-Agent": USER_AGENT}, **kwargs) as r:
+            r.raise_for_status()
+            return AsyncResponse(str(r.url), await r.text())
+    await request("POST", server_url) #get cookies
+    r = await request("POST", server_url + "/wtouch/wtouch.exe/verify",
+                      data={"Crew_Id": enc_username, "Crm": enc_password})
+    if heartbeat: heartbeat()
+    base_url = r.url.split("wtouch.exe")[0]
+    async def post(rel_url: str, data: T.Dict[str, str]) -> AsyncResponse:
+        url = base_url + rel_url
+        if "useGET" in data.keys():
+            del data["useGET"]
+            method, key = "GET", "params"
+        else:
+            method, key = "POST", "data"
+        #unlike requests, aiohttp will not serialise non-string values
+        r = await request(method, url, **{key: {K: str(V) for K, V in data.items()}})
+        if heartbeat: heartbeat()
+        return r
+    retval: AsyncPostFunc = post
+    #If already logged in, need to logout then login again
+    if r.text.find("Please log out and try again.") != -1:
+        if not recurse: raise AT.LogonError
+        await async_logout(post)
+        retval = await _async_login(session, server_url, enc_username,
+                                    enc_password, heartbeat, timeout, False)
+    if (r.text.find("Please re-enter your Credentials and try again") != -1 or
+        r.text.find("Please swipe your card to log-in") != -1):
+        raise AT.UsernamePasswordError
+    return retval
+
+
+async def async_connect(
+        server_url: str, username:str, pw:str, session: T.Any,
+        hb: HeartbeatFunc = None
+) -> AsyncPostFunc:
+    """Connects to AIMS server from asyncio code.
+
+    :param server_url: The url of the AIMS server to connect to
+    :param username: Registered username of user
+    :param pw: Password of user
+    :param session: An aiohttp.ClientSession. Each user must have their own
+        session, since the AIMS login is held in its cookie jar, but the
+        sessions of many users may share a single connector.
+
+    :return: Coroutine function to be called to send requests to AIMS. It
+        has the form post(relative_url, data_dictionary) and the same
+        "useGET" convention as the function returned from connect. It
+        returns an AsyncResponse object.
+
+    :raises aiohttp.ClientError: A network problem occured or a request
+        returned an unsuccessful status code.
+    :raises asyncio.TimeoutError: No response from server within
+        REQUEST_TIMEOUT seconds.
+
+    This requires the optional aiohttp package. The caller is responsible
+    for closing session.
+    """
+    import aiohttp #optional dependency, only needed for asyncio access
+    timeout = aiohttp.ClientTimeout(total=float(REQUEST_TIMEOUT))
+    encoded_id, encoded_pw = _encode_credentials(username, pw)
+    post_func = await _async_login(
+        session, server_url, encoded_id, encoded_pw, hb, timeout)
     del pw #for ease of auditing
     return post_func
 
@@ -118,6 +232,16 @@ def logout(post: PostFunc) -> None:
     post("perinfo.exe/AjAction?LOGOUT=1", {"AjaxOperation": "0"})
 
 
+async def async_logout(post: AsyncPostFunc) -> None:
+    """Asyncio version of logout.
+
+    :param post: The coroutine function returned from async_connect.
+
+    :return: None
+    """
+    await post("perinfo.exe/AjAction?LOGOUT=1", {"AjaxOperation": "0"})
+
+
 def changes(post: PostFunc) -> bool:
     """Check for changes notification.
 
@@ -129,3 +253,50 @@ def changes(post: PostFunc) -> bool:
     r = post("perinfo.exe/index", {"useGet": "1"})
     no_changes_marker = '\r\nvar notification = Trim("");\r\n'
     return  True if r.text.find(no_changes_marker) == -1 else False
+
+
+class TokenBucket:
+    """Thread safe token bucket rate limiter.
+
+    :param rate: Tokens added to the bucket per second.
+    :param burst: Maximum number of tokens the bucket can hold.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        assert rate > 0 and burst >= 1
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+
+    def acquire(self) -> None:
+        """Block until a token is available, then consume it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            #the token is consumed now, the sleep pays off the debt
+            self.tokens -= 1
+        if wait: time.sleep(wait)
+
+
+def rate_limited(post: PostFunc, rate: float, burst: int = 1) -> PostFunc:
+    """Wrap a post function so that requests are rate limited.
+
+    :param post: The function returned from connect.
+    :param rate: Maximum sustained requests per second.
+    :param burst: Number of requests that may be sent without delay after
+        a quiet period.
+
+    :return: A function with the same signature as post. It is safe to call
+        from multiple threads; all calls share the same limit.
+    """
+    bucket = TokenBucket(rate, burst)
+    def limited_post(rel_url: str, data: T.Dict[str, str]) -> requests.Response:
+        bucket.acquire()
+        return post(rel_url, data)
+    return limited_post
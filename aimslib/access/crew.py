@@ -2,7 +2,7 @@ from bs4 import BeautifulSoup
 from aimslib.common.types import BadCrewList, CrewMember
 from typing import List
 
-from aimslib.access.connect import PostFunc
+from aimslib.access.connect import PostFunc, AsyncPostFunc
 
 def retrieve(post: PostFunc, id_: str) -> str:
     """Downloads and returns the html of a crewlist.
@@ -19,6 +19,18 @@ def retrieve(post: PostFunc, id_: str) -> str:
     return r.text
 
 
+async def async_retrieve(post: AsyncPostFunc, id_: str) -> str:
+    """Asyncio version of retrieve.
+
+    :param post: Coroutine function returned from connect.async_connect()
+    :param id_: The crew identifier, as for retrieve.
+
+    :return: The HTML of a crew sheet.
+    """
+    r = await post("perinfo.exe/getlegmem",{"useGet": "1", "LegInfo": id_})
+    return r.text
+
+
 def crewlist(html: str) -> List[CrewMember]:
     """Convert an AIMS HTML crew list into a crew list.
 
@@ -1,41 +1,215 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator, Set
 import os.path
+import tempfile
 import sys
+import urllib.parse
+import datetime as DT
 
-from  aimslib.access.cache import TripCache, CrewlistCache
-from aimslib.common.types import Duty, NoTripDetails, CrewMember
+from  aimslib.access.cache import (
+    TripCache, CrewlistCache,
+    _load_pickle, _write_pickle, _locked, _file_mode)
+from aimslib.access.connect import rate_limited, changes
+from aimslib.common.types import Duty, TripID, NoTripDetails, CrewMember
 import aimslib.access.brief_roster as Roster
 
 
 CACHE_DIR = os.path.expanduser("~/.cache/")
+CACHE_BACKEND = "pickle" #or "sqlite"
+CACHE_MAX_ENTRIES = 0 #0 means unlimited
+CACHE_MAX_AGE = 0 #in days, 0 means unlimited
+TRIP_REFRESH_INTERVAL = 0 #in seconds, 0 means refresh on every sync
 
 
-def duties(post_func, months: int) -> List[Duty]:
+def _cache(cls, basename: str, post_func):
+    """Open the cache in CACHE_DIR using CACHE_BACKEND.
+
+    When the sqlite backend is opened for the first time, any existing pickle
+    file cache is imported into it. The import is made into a temporary
+    database that is only renamed into place once it is complete, so an
+    interrupted import is retried the next time. The pickle file's lock is
+    held for the import, so only one process imports it.
+    """
+    filename = CACHE_DIR + basename
+    kwargs = {}
+    if cls is TripCache:
+        kwargs["refresh_interval"] = TRIP_REFRESH_INTERVAL
+    def open_cache(filename):
+        return cls(filename, post_func, CACHE_BACKEND,
+                   CACHE_MAX_ENTRIES, CACHE_MAX_AGE, **kwargs)
+    if CACHE_BACKEND == "pickle":
+        return open_cache(filename)
+    sqlite_file = filename + ".sqlite"
+    if not os.path.exists(sqlite_file) and os.path.exists(filename):
+        with _locked(filename):
+            #another process may have imported it while we waited for the lock
+            if not os.path.exists(sqlite_file):
+                _import(open_cache, filename, sqlite_file)
+    return open_cache(sqlite_file)
+
+
+def _import(open_cache, filename: str, sqlite_file: str) -> None:
+    fd, tmp_file = tempfile.mkstemp(
+        suffix=".tmp", dir=os.path.dirname(sqlite_file) or ".")
+    os.close(fd)
+    try:
+        cache = open_cache(tmp_file)
+        try:
+            cache.import_pickle(filename)
+        finally:
+            cache.close()
+        os.chmod(tmp_file, _file_mode(sqlite_file))
+        os.replace(tmp_file, sqlite_file)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+
+
+def duties(post_func, months: int, max_workers: int = 0) -> List[Duty]:
+    """Build an expanded duty list from brief rosters and trip sheets.
+
+    :param post_func: Closure returned from connect.connect()
+    :param months: The number of brief rosters to access, negative for
+        backwards from the current roster.
+    :param max_workers: If greater than zero, trip sheets that are not in the
+        cache are downloaded concurrently with at most this many requests in
+        flight. Zero means download them one at a time.
+
+    :return: A sorted list of Duty objects.
+    """
+    return _expanded(post_func, _sparse_duties(post_func, months),
+                     max_workers)
+
+
+def _sparse_duties(post_func, months: int) -> List[Duty]:
+    #sorted brief roster duties, before expansion from trip sheets
     sparse_dutylist = []
     if months < 0: months += 1
     else: months -= 1
     for r in Roster.retrieve(post_func, months):
         sparse_dutylist.extend(Roster.duties(Roster.parse(r)))
-    expanded_dutylist = []
-    trip_cache = TripCache(CACHE_DIR + "aimslib.tripcache", post_func)
+    sparse_dutylist.sort()
+    return sparse_dutylist
+
+
+def _expanded(post_func, sparse_dutylist: List[Duty], max_workers: int
+) -> List[Duty]:
+    trip_cache = _cache(TripCache, "aimslib.tripcache", post_func)
+    expanded_dutylist = list(_expand(sparse_dutylist, trip_cache, max_workers))
+    trip_cache.store()
+    return expanded_dutylist
+
+
+def sync(post_func, crew_id: str, months: int, max_workers: int = 0
+) -> List[Duty]:
+    """Incremental version of duties.
+
+    :param post_func: Closure returned from connect.connect()
+    :param crew_id: The username that post_func was connected with.
+    :param months: As for duties.
+    :param max_workers: As for duties.
+
+    :return: A sorted list of Duty objects.
+
+    The brief roster duties of each full sync are kept as a snapshot in
+    CACHE_DIR, with a separate snapshot for each crew_id. If the snapshot
+    was taken today with the same value of months and AIMS reports no
+    changes notification, the brief rosters are not downloaded. Instead,
+    the snapshot is expanded through the trip cache, so trips that are
+    still awaiting actual times are refreshed and trips that have been
+    evicted from the cache are downloaded again.
+    """
+    snapshot_file = (CACHE_DIR +
+                     f"aimslib.{urllib.parse.quote(crew_id, safe='')}.snapshot")
+    snapshot = _load_pickle(snapshot_file)
+    today = DT.datetime.utcnow().date()
+    key = {"crew_id": crew_id, "date": today, "months": months}
+    if (any(snapshot.get(K) != V for K, V in key.items())
+        or "sparse_duties" not in snapshot or changes(post_func)):
+        sparse_dutylist = _sparse_duties(post_func, months)
+        _write_pickle(snapshot_file,
+                      dict(key, sparse_duties=sparse_dutylist))
+    else:
+        sparse_dutylist = snapshot["sparse_duties"]
+    return _expanded(post_func, sparse_dutylist, max_workers)
+
+
+def iter_duties(post_func, months: int, max_workers: int = 0
+) -> Iterator[Duty]:
+    """Generator version of duties.
+
+    :param post_func: Closure returned from connect.connect()
+    :param months: As for duties.
+    :param max_workers: As for duties, but applied to one brief roster
+        page at a time.
+
+    :yields: Expanded Duty objects, page by page as each brief roster page
+        is retrieved. Duties are sorted within a page, and pages are in the
+        order they are retrieved, i.e. reverse chronological order if
+        months is negative.
+
+    A trip that appears on more than one page is only yielded once, from
+    the first page it appears on. The identifiers of all the trips seen so
+    far are retained for this, which is far smaller than the duties
+    themselves. The trip cache is stored when the generator finishes or is
+    closed.
+    """
+    if months < 0: months += 1
+    else: months -= 1
+    trip_cache = _cache(TripCache, "aimslib.tripcache", post_func)
+    seen_ids: Set[TripID] = set()
+    try:
+        for r in Roster.retrieve(post_func, months):
+            page = Roster.duties(Roster.parse(r))
+            page = sorted(X for X in page if X.trip_id not in seen_ids)
+            seen_ids.update(X.trip_id for X in page)
+            yield from _expand(page, trip_cache, max_workers)
+    finally:
+        trip_cache.store()
+
+
+def _expand(sparse_dutylist: List[Duty], trip_cache: TripCache,
+            max_workers: int) -> Iterator[Duty]:
+    #sparse_dutylist must be sorted
+    if max_workers > 0:
+        trip_cache.prefetch(
+            [X.trip_id for X in sparse_dutylist if X.start is None],
+            max_workers)
     last_id = None
-    for duty in sorted(sparse_dutylist):
+    for duty in sparse_dutylist:
         if duty.trip_id == last_id: continue #avoid duplicates
         last_id = duty.trip_id
         if duty.start is None:
             try:
-                expanded_dutylist.extend(trip_cache.trip(duty.trip_id))
+                yield from trip_cache.trip(duty.trip_id)
             except NoTripDetails:
                 print(f"Trip details not found for: {duty.trip_id}",
                       file=sys.stderr)
         else:
-            expanded_dutylist.append(duty)
-    trip_cache.store()
-    return expanded_dutylist
+            yield duty
+
+
+def crew(post_func, dutylist: List[Duty],
+         max_workers: int = 0, rate: float = 0.0
+) -> Dict[str, List[CrewMember]]:
+    """Build a map of crewlist_id to crew list for the sectors of dutylist.
 
+    :param post_func: Closure returned from connect.connect()
+    :param dutylist: A list of Duty objects, as returned from duties()
+    :param max_workers: If greater than zero, crew lists that are not in the
+        cache are downloaded concurrently with at most this many requests in
+        flight. Zero means download them one at a time.
+    :param rate: If non-zero, the maximum number of crew list requests per
+        second sent to the AIMS server.
 
-def crew(post_func, dutylist: List[Duty]) -> Dict[str, List[CrewMember]]:
-    crew_cache = CrewlistCache(CACHE_DIR + "aimslib.clcache", post_func)
+    :return: A dictionary mapping crewlist_id to a list of CrewMember objects.
+    """
+    if rate: post_func = rate_limited(post_func, rate)
+    crew_cache = _cache(CrewlistCache, "aimslib.clcache", post_func)
+    if max_workers > 0:
+        crew_cache.prefetch(
+            [X.crewlist_id for duty in dutylist if duty.sectors
+             for X in duty.sectors if X.crewlist_id],
+            max_workers)
     crewlist_map = {}
     for duty in dutylist:
         if duty.sectors:
@@ -1,9 +1,10 @@
 import datetime as dt
-from typing import NamedTuple, List
+from typing import NamedTuple, List, Dict
 from bs4 import BeautifulSoup
 import sys
 
-from aimslib.access.connect import PostFunc
+from aimslib.access.connect import PostFunc, AsyncPostFunc
+import aimslib.common.times as times
 
 
 class Flight(NamedTuple):
@@ -32,33 +33,48 @@ class Flight(NamedTuple):
     on: dt.datetime
 
 
+def _request_data(d: dt.date, type_: str, airport: str) -> Dict[str, str]:
+    assert type_ in ("A", "D", "")
+    dstr = dt.date.strftime(d, "%d/%m/%Y")
+    deps = 0
+    if type_:
+        deps = "1" if type_ == "D" else "2"
+    return {
+        "AjaxOperation": "2",
+        "cal1": dstr,
+        "Airport": airport,
+        "ACRegistration": "",
+        "Deps": deps,
+        "Flight": "",
+        "times_format": "2",
+    }
+
+
 def retrieve(
         post: PostFunc,
         d: dt.date,
         type_: str="",
         airport: str=""
 ) -> str:
-    assert type_ in ("A", "D", "")
-    dstr = dt.date.strftime(d, "%d/%m/%Y")
-    deps = 0
-    if type_:
-        deps = "1" if type_ == "D" else "2"
-    r = post(
-        "fltinfo.exe/AjAction", {
-            "AjaxOperation": "2",
-            "cal1": dstr,
-            "Airport": airport,
-            "ACRegistration": "",
-            "Deps": deps,
-            "Flight": "",
-            "times_format": "2",
-            })
+    r = post("fltinfo.exe/AjAction", _request_data(d, type_, airport))
+    return r.text
+
+
+async def async_retrieve(
+        post: AsyncPostFunc,
+        d: dt.date,
+        type_: str="",
+        airport: str=""
+) -> str:
+    r = await post("fltinfo.exe/AjAction", _request_data(d, type_, airport))
     return r.text
 
 
 def _to_dt(s:str, d: dt.date) -> dt.datetime:
-    return dt.datetime.combine(
-        d, dt.datetime.strptime(s, "%H:%M").time())
+    t = times.hm(s)
+    if t is None:
+        raise ValueError(f"time data {s!r} does not match format '%H:%M'")
+    return dt.datetime.combine(d, t)
 
 
 def parse(html:str, d: dt.date
@@ -0,0 +1,155 @@
+"""
+This module provides a pool of authenticated AIMS sessions for programs that
+access AIMS on behalf of many users:
+
+SessionPool - holds one logged in session per user, sharing connections
+"""
+
+import typing as T
+import collections
+import threading
+import time
+import requests
+import requests.adapters
+
+from aimslib.access.connect import (
+    PostFunc, HeartbeatFunc,
+    _session, _login, _encode_credentials, logout)
+
+
+#The AIMS login form contains this field. If it turns up in a response to
+#a request made with a logged in session, the session has expired.
+SESSION_EXPIRED_MARKER = 'name="Crew_Id"'
+
+
+class _PooledSession(T.NamedTuple):
+    session: requests.Session
+    post: PostFunc
+    last_used: float
+
+
+class SessionPool:
+    """A pool of logged in AIMS sessions, keyed by username.
+
+    :param server_url: The url of the AIMS server to connect to.
+    :param idle_timeout: Sessions unused for this many seconds are logged
+        out and discarded.
+    :param pool_maxsize: The number of connections to each AIMS host that
+        are kept open for reuse.
+    :param heartbeat: Function called after each request.
+
+    Every session shares a single HTTPAdapter, and thus a single set of
+    connection pools, so that logging in a new user does not require a new
+    TCP connection and TLS handshake. The adapter keeps a pool for each of
+    up to requests' default number of hosts, since the login may redirect
+    to a different host from server_url. Cookies, and hence the AIMS login,
+    remain per session.
+    """
+
+    def __init__(self, server_url: str, idle_timeout: float = 900,
+                 pool_maxsize: int = 10, heartbeat: HeartbeatFunc = None
+    ) -> None:
+        self.server_url = server_url
+        self.idle_timeout = idle_timeout
+        self.heartbeat = heartbeat
+        self.adapter = requests.adapters.HTTPAdapter(
+            pool_connections=requests.adapters.DEFAULT_POOLSIZE,
+            pool_maxsize=pool_maxsize)
+        self.sessions: T.Dict[str, _PooledSession] = {}
+        self.credentials: T.Dict[str, T.Tuple[str, str]] = {}
+        self.lock = threading.Lock()
+        #logging in is slow, so each user has a lock to prevent duplicate
+        #logins without holding up other users
+        self.user_locks: T.DefaultDict[str, threading.Lock] = (
+            collections.defaultdict(threading.Lock))
+
+
+    def connect(self, username: str, pw: str) -> PostFunc:
+        """Get a post function for username, logging in if required.
+
+        :param username: Registered username of user
+        :param pw: Password of user
+
+        :return: Function with the same form as that returned by
+            connect.connect(). If a response indicates that the AIMS session
+            has expired, the function logs in again and repeats the request.
+
+        :raises: As for connect.connect().
+        """
+        with self.lock:
+            self.credentials[username] = _encode_credentials(username, pw)
+        del pw #for ease of auditing
+        self._get(username)
+        def post(rel_url: str, data: T.Dict[str, str]) -> requests.Response:
+            current = self._get(username)
+            r = current(rel_url, dict(data))
+            if r.text.find(SESSION_EXPIRED_MARKER) != -1:
+                r = self._get(username, expired=current)(rel_url, dict(data))
+            return r
+        return post
+
+
+    def disconnect(self, username: str) -> None:
+        """Log out username and forget their credentials."""
+        with self.lock:
+            entry = self.sessions.pop(username, None)
+            self.credentials.pop(username, None)
+        if entry: _logout_quietly(entry.post)
+
+
+    def _get(self, username: str, expired: T.Optional[PostFunc] = None
+    ) -> PostFunc:
+        self.evict_idle()
+        with self.lock:
+            user_lock = self.user_locks[username]
+        with user_lock:
+            with self.lock:
+                entry = self.sessions.get(username)
+                credentials = self.credentials[username]
+            #if another thread has already replaced the expired session, it
+            #can be used as is
+            if entry is None or entry.post is expired:
+                session = _session()
+                session.mount("https://", self.adapter)
+                session.mount("http://", self.adapter)
+                post = _login(session, self.server_url,
+                              *credentials, self.heartbeat)
+                entry = _PooledSession(session, post, time.monotonic())
+            with self.lock:
+                self.sessions[username] = entry._replace(
+                    last_used=time.monotonic())
+            return entry.post
+
+
+    def evict_idle(self) -> None:
+        """Log out and discard sessions that have exceeded idle_timeout.
+
+        Credentials are retained, so a post function for an evicted user
+        will log in again the next time it is called.
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        with self.lock:
+            idle = [K for K, V in self.sessions.items() if V.last_used < cutoff]
+            evicted = [self.sessions.pop(K) for K in idle]
+        for entry in evicted:
+            _logout_quietly(entry.post)
+
+
+    def close(self) -> None:
+        """Log out all sessions and close the shared connection pool."""
+        with self.lock:
+            evicted = list(self.sessions.values())
+            self.sessions.clear()
+            self.credentials.clear()
+        for entry in evicted:
+            _logout_quietly(entry.post)
+        self.adapter.close()
+
+
+def _logout_quietly(post: PostFunc) -> None:
+    #the server may well have expired the session already, so failure to
+    #log out is not an error
+    try:
+        logout(post)
+    except requests.RequestException:
+        pass
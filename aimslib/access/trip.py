@@ -1,17 +1,29 @@
 from bs4 import BeautifulSoup #type: ignore
-from typing import List
+from typing import List, Dict, Optional, Tuple
 import datetime as DT
 import re
 
-from aimslib.access.connect import PostFunc
+from aimslib.access.connect import PostFunc, AsyncPostFunc
 from aimslib.common.types import (
     TripID, Sector, SectorFlags, Duty,
     BadTripDetails, NoTripDetails, BadAIMSSector, BadAIMSDuty,
 )
+import aimslib.common.times as times
+from aimslib.common.htmlparse import StackParser
 
 AimsSector = List[str]
 AimsDuty = List[AimsSector]
 
+
+def _request_data(trip_id: TripID) -> Dict[str, str]:
+    return {
+        "useGET": "1",
+        "FltInf": "1",
+        "ORGDAY": trip_id.aims_day,
+        "CROUTE": trip_id.trip,
+    }
+
+
 def retrieve(post: PostFunc, trip_id: TripID) -> str:
     """Downloads and returns the html of a trip sheet.
 
@@ -25,19 +37,29 @@ def retrieve(post: PostFunc, trip_id: TripID) -> str:
         if you click a trip identifier on "Crew Schedule - Brief"
         (e.g. B089) then click the "Trip Details in UTC button".
     """
-    r = post("perinfo.exe/schedule", {
-                 "useGET": "1",
-                 "FltInf": "1",
-                 "ORGDAY": trip_id.aims_day,
-                 "CROUTE": trip_id.trip,
-             })
+    r = post("perinfo.exe/schedule", _request_data(trip_id))
+    return r.text
+
+
+async def async_retrieve(post: AsyncPostFunc, trip_id: TripID) -> str:
+    """Asyncio version of retrieve.
+
+    :param post: The coroutine function returned from connect.async_connect()
+    :param trip_id: As for retrieve.
+
+    :return: The html of an AIMS trip sheet.
+    """
+    r = await post("perinfo.exe/schedule", _request_data(trip_id))
     return r.text
 
 
-def parse(html:str) -> List[AimsDuty]:
+def parse(html:str, backend: str = "fast") -> List[AimsDuty]:
     """Parse trip details out of a AIMS trip sheet.
 
     :param html: The HTML of an AIMS trip sheet
+    :param backend: "fast" to use a single pass html.parser based parser,
+        or "bs4" to use BeautifulSoup. Both produce identical output; the
+        BeautifulSoup version is retained as a reference implementation.
 
     :return: Returns a List[AimsDuty]:
 
@@ -76,8 +98,15 @@ def parse(html:str) -> List[AimsDuty]:
      have the form HH:MM, although the departure date is of the form
      Fri18Jan.
     """
+    assert backend in ("fast", "bs4")
     if html.find("Unable to find the trip details") != -1:
         raise NoTripDetails
+    if backend == "fast":
+        return _parse_fast(html)
+    return _parse_bs4(html)
+
+
+def _parse_bs4(html: str) -> List[AimsDuty]:
     soup = BeautifulSoup(html, "html.parser")
     first_sector = soup.find("tr", class_="mono_rows_ctrl_f3")
     if not first_sector:
@@ -100,6 +129,72 @@ def parse(html:str) -> List[AimsDuty]:
     return aims_duties
 
 
+class _TripParser(StackParser):
+    """Single pass parser that collects the rows needed by parse.
+
+    The first tr with class mono_rows_ctrl_f3 is found, then it and all
+    its following sibling tr elements are recorded as (is_sector, id,
+    text) tuples in self.rows. Each element is stored on the stack with a
+    unique element number.
+    """
+
+    def __init__(self):
+        StackParser.__init__(self)
+        self.element_count = 0
+        self.parent: Optional[int] = None
+        self.rows: List[Tuple[bool, Optional[str], List[str]]] = []
+        self.row_element: Optional[int] = None
+
+
+    def start_element(self, tag, attrs):
+        self.element_count += 1
+        if tag != "tr" or self.row_element is not None:
+            return self.element_count
+        parent = self.stack[-1][1] if self.stack else 0
+        attrs = dict(attrs)
+        is_sector = "mono_rows_ctrl_f3" in (attrs.get("class") or "").split()
+        if self.parent is None and is_sector:
+            self.parent = parent
+        if self.parent == parent:
+            self.rows.append((is_sector, attrs.get("id", None), []))
+            self.row_element = self.element_count
+        return self.element_count
+
+
+    def end_elements(self, values, depth):
+        if self.row_element in values:
+            self.row_element = None
+
+
+    def handle_data(self, data):
+        if self.row_element is not None:
+            self.rows[-1][2].append(data)
+
+
+def _parse_fast(html: str) -> List[AimsDuty]:
+    parser = _TripParser()
+    parser.feed(html)
+    parser.close()
+    if not parser.rows:
+        raise BadTripDetails("tr.mono_rows_ctrl_f3 not found")
+    _, id_, strings = parser.rows[0]
+    aims_sector = [id_] + "".join(strings).split()
+    aims_duty: AimsDuty = [aims_sector]
+    aims_duties = [aims_duty]
+    for is_sector, id_, strings in parser.rows[1:]:
+        if is_sector:
+            text = "".join(strings)
+            sector = [id_] + text.split()
+            if len(sector) < 6: #gross error check
+                raise BadTripDetails(text)
+            aims_duty.append(sector)
+        elif aims_duty != []:
+            aims_duty = []
+            aims_duties.append(aims_duty)
+    if aims_duties[-1] == []: del aims_duties[-1]
+    return aims_duties
+
+
 def _sector(aims_sector: AimsSector, date: DT.date
 ) -> Sector:
     """Convert an AimsSector object into a Sector object.
@@ -141,20 +236,19 @@ def _sector(aims_sector: AimsSector, date: DT.date
         elif field == "PAX":
             pax = True
     try:
-        sched_off, sched_on = (X + "+0" if len(X) == 4 else X
-                               for X in (sched_off, sched_on))
-        sched_off_t, sched_on_t = (DT.datetime.strptime(X[:4], "%H%M").time()
-                                   for X in (sched_off, sched_on))
-        sched_off_dt = (DT.datetime.combine(date, sched_off_t)
-                        + DT.timedelta(days=int(sched_off[5])))
-        sched_on_dt = (DT.datetime.combine(date, sched_on_t)
-                       + DT.timedelta(days=int(sched_on[5])))
+        midnight = DT.datetime.combine(date, DT.time(0, 0))
+        sched_off_delta, sched_on_delta = (
+            times.hhmm_delta(X) for X in (sched_off, sched_on))
+        if sched_off_delta is None or sched_on_delta is None:
+            raise ValueError
+        sched_off_dt = midnight + sched_off_delta
+        sched_on_dt = midnight + sched_on_delta
         #actual times don't have +1 for after midnight, so use
         #proximity to schedule
         off_dt, on_dt = None, None
         if on:
-            off_t, on_t = (DT.datetime.strptime(X[:4], "%H%M").time()
-                           for X in (off, on))
+            off_t, on_t = (times.hhmm(X[:4]) for X in (off, on))
+            if off_t is None or on_t is None: raise ValueError
             off_dt, on_dt = (DT.datetime.combine(date, X)
                              for X in (off_t, on_t))
             if sched_off_dt - off_dt > DT.timedelta(days=1) / 2:
@@ -192,11 +286,11 @@ def _duty(aims_duty: AimsDuty, trip_id: TripID, trip_day: int) -> Duty:
         date = start_date + DT.timedelta(days=trip_day)
         #fix for AIMS bug where end of duty can have non-existent time 24:00
         if aims_duty[-1][-1] == "24:00": aims_duty[-1][-1] = "00:00"
-        duty_end_time = DT.datetime.strptime(
-            aims_duty[-1][-1], "%H:%M").time()
+        duty_end_time = times.hm(aims_duty[-1][-1])
         index = -2 if len(aims_duty) == 1 else -1
-        duty_start_time = DT.datetime.strptime(
-            aims_duty[0][index], "%H:%M").time()
+        duty_start_time = times.hm(aims_duty[0][index])
+        if duty_start_time is None or duty_end_time is None:
+            raise ValueError
     except:
         raise BadAIMSDuty(str(aims_duty))
     duty_start, duty_end = (
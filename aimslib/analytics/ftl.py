@@ -0,0 +1,122 @@
+"""
+Evaluation of cumulative flight time limitations (FTL) over a duty list.
+
+Limit - a limit on duty or block time within a period
+evaluate - check limits for every day of a range, reporting breaches and
+    headroom
+
+This module requires NumPy, available with the "analytics" extra.
+
+Each limit is evaluated for every day in a single vectorised pass using
+prefix sums over the sorted duty and block times, so the cost does not grow
+with the product of days and duties. Duties and sectors that cross the start
+of a period are split by the minute, so only the part within the period is
+counted. Block time is the time of flown sectors as described in
+aimslib.analytics.rolling.
+"""
+
+import datetime as DT
+import enum
+from typing import NamedTuple, Iterable, Optional, List, Sequence
+
+import numpy as np
+
+from aimslib.common.types import Duty
+from aimslib.analytics.rolling import _arrays, _days, _covered, _DAY_MINUTES
+
+
+class Period(enum.Enum):
+    """How the period of a Limit is measured back from the day evaluated.
+
+    DAYS is the given number of consecutive days ending on the day.
+    CALENDAR_MONTHS is the given number of calendar months, ending with the
+    month containing the day. CALENDAR_YEAR is the calendar year containing
+    the day. In all cases the period ends at the end of the day evaluated.
+    """
+    DAYS = 0
+    CALENDAR_MONTHS = 1
+    CALENDAR_YEAR = 2
+
+
+class Limit(NamedTuple):
+    name: str
+    quantity: str #"duty" or "block"
+    hours: float
+    length: int = 1 #number of days or months, ignored for CALENDAR_YEAR
+    period: Period = Period.DAYS
+
+
+#The cumulative limits of EASA ORO.FTL.210
+DEFAULT_LIMITS = (
+    Limit("60 duty hours in 7 days", "duty", 60, 7),
+    Limit("110 duty hours in 14 days", "duty", 110, 14),
+    Limit("190 duty hours in 28 days", "duty", 190, 28),
+    Limit("100 block hours in 28 days", "block", 100, 28),
+    Limit("900 block hours in a calendar year", "block", 900,
+          period=Period.CALENDAR_YEAR),
+    Limit("1000 block hours in 12 calendar months", "block", 1000, 12,
+          Period.CALENDAR_MONTHS),
+)
+
+
+class LimitReport(NamedTuple):
+    """The evaluation of a Limit.
+
+    Element k of each array is for the period ending on days[k]. Totals and
+    headroom are in minutes; negative headroom means the limit is exceeded.
+    """
+    limit: Limit
+    days: np.ndarray #datetime64[D]
+    totals: np.ndarray
+    headroom: np.ndarray
+    breaches: List[DT.date]
+
+
+def _period_starts(days: np.ndarray, limit: Limit) -> np.ndarray:
+    """Return the first day of the limit's period for each day."""
+    if limit.period == Period.DAYS:
+        return days - (limit.length - 1)
+    if limit.period == Period.CALENDAR_MONTHS:
+        months = days.astype("datetime64[M]") - (limit.length - 1)
+        return months.astype("datetime64[D]")
+    if limit.period == Period.CALENDAR_YEAR:
+        return days.astype("datetime64[Y]").astype("datetime64[D]")
+    raise ValueError(f"Unknown period: {limit.period}")
+
+
+def evaluate(duties: Iterable[Duty],
+             limits: Sequence[Limit] = DEFAULT_LIMITS,
+             first: Optional[DT.date] = None,
+             last: Optional[DT.date] = None
+) -> List[LimitReport]:
+    """Evaluate cumulative limits for every day in a range.
+
+    :param duties: The duties to evaluate, e.g. the output of
+        expanded_roster.duties. They may be in any order. Duties before first
+        are included in periods that overlap them, so for a complete
+        evaluation the duties should go back a full period before first.
+    :param limits: The limits to evaluate.
+    :param first: The first day to evaluate. Defaults to the day of the
+        earliest duty start.
+    :param last: The last day to evaluate. Defaults to the day of the
+        latest duty finish.
+
+    :return: A LimitReport for each limit, in the same order as limits.
+    """
+    arrays = _arrays(duties, night=False)
+    days = _days(arrays, first, last)
+    ends = (days.astype(np.int64) + 1) * _DAY_MINUTES
+    intervals = {"duty": (arrays.duty_starts, arrays.duty_ends),
+                 "block": (arrays.block_starts, arrays.block_ends)}
+    reports = []
+    for limit in limits:
+        if limit.quantity not in intervals:
+            raise ValueError(f"Unknown quantity: {limit.quantity}")
+        starts = _period_starts(days, limit).astype(np.int64) * _DAY_MINUTES
+        covered = _covered(*intervals[limit.quantity],
+                           np.concatenate((ends, starts)))
+        totals = covered[:len(days)] - covered[len(days):]
+        headroom = round(limit.hours * 60) - totals
+        breaches = days[headroom < 0].tolist()
+        reports.append(LimitReport(limit, days, totals, headroom, breaches))
+    return reports
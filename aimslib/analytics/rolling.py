@@ -0,0 +1,178 @@
+"""
+Vectorised daily and rolling totals over duty histories.
+
+rolling_totals - duty, block, sector and night totals over rolling windows
+daily_totals - the same totals for each individual day
+
+This module requires NumPy, available with the "analytics" extra.
+
+Duty and block time are split across the days they span. Sector counts and
+night time are assigned to the day of the sector's start. Block time, sector
+counts and night time are only for flown sectors, i.e. those without the
+QUASI, POSITIONING or GROUND_DUTY flags. Actual times are used where a
+sector has them, otherwise scheduled times. All days are UTC days.
+"""
+
+import datetime as DT
+from typing import NamedTuple, Iterable, Optional, Dict, Sequence
+
+import numpy as np
+import nightflight.night as nightcalc
+from nightflight.airport_nvecs import airfields as nvecs
+
+from aimslib.common.types import Duty, Sector, SectorFlags
+
+
+_EPOCH = DT.datetime(1970, 1, 1)
+_MINUTE = DT.timedelta(minutes=1)
+_DAY_MINUTES = 1440
+_NOT_FLOWN = (SectorFlags.QUASI | SectorFlags.POSITIONING
+              | SectorFlags.GROUND_DUTY)
+
+
+class Totals(NamedTuple):
+    """Totals for each day of a range.
+
+    Element k of each array is the total for the window ending on days[k].
+    Durations are in minutes.
+    """
+    days: np.ndarray #datetime64[D]
+    duty: np.ndarray
+    block: np.ndarray
+    sectors: np.ndarray
+    night: np.ndarray
+
+
+class _Arrays(NamedTuple):
+    duty_starts: np.ndarray
+    duty_ends: np.ndarray
+    block_starts: np.ndarray
+    block_ends: np.ndarray
+    night: np.ndarray #night minutes of each flown sector, in block order
+
+
+def _minutes(d: DT.datetime) -> int:
+    return (d - _EPOCH) // _MINUTE
+
+
+def _sector_times(sector: Sector):
+    if sector.act_start and sector.act_finish:
+        return sector.act_start, sector.act_finish
+    return sector.sched_start, sector.sched_finish
+
+
+def _night(sector: Sector, start: DT.datetime, end: DT.datetime) -> float:
+    try:
+        return nightcalc.night_duration(
+            nvecs[sector.from_], nvecs[sector.to], start, end)
+    except KeyError: #raised by nvecs if airfields not found
+        return 0.0
+
+
+def _arrays(duties: Iterable[Duty], night: bool) -> _Arrays:
+    duty_times, block_times, night_times = [], [], []
+    for duty in duties:
+        if duty.start is None or duty.finish is None: continue
+        duty_times.append((_minutes(duty.start), _minutes(duty.finish)))
+        for sector in duty.sectors or ():
+            if sector.flags & _NOT_FLOWN: continue
+            start, end = _sector_times(sector)
+            block_times.append((_minutes(start), _minutes(end)))
+            night_times.append(_night(sector, start, end) if night else 0.0)
+    duty_array = np.array(duty_times, dtype=np.int64).reshape(-1, 2)
+    block_array = np.array(block_times, dtype=np.int64).reshape(-1, 2)
+    return _Arrays(duty_array[:, 0], duty_array[:, 1],
+                   block_array[:, 0], block_array[:, 1],
+                   np.array(night_times, dtype=np.float64))
+
+
+def _covered(starts: np.ndarray, ends: np.ndarray, t: np.ndarray
+) -> np.ndarray:
+    """Total length of the intervals [starts, ends) that falls before each
+    time in t."""
+    keep = ends > starts
+    starts, ends = np.sort(starts[keep]), np.sort(ends[keep])
+    start_sums = np.concatenate(([0], np.cumsum(starts)))
+    end_sums = np.concatenate(([0], np.cumsum(ends)))
+    #sum of (t - s) for started intervals, less sum of (t - e) for ended ones
+    n_started = np.searchsorted(starts, t, side="right")
+    n_ended = np.searchsorted(ends, t, side="right")
+    return ((n_started * t - start_sums[n_started])
+            - (n_ended * t - end_sums[n_ended]))
+
+
+def _counted(times: np.ndarray, weights: np.ndarray, t: np.ndarray
+) -> np.ndarray:
+    """Sum of the weights of events occurring before each time in t."""
+    order = np.argsort(times, kind="stable")
+    sums = np.concatenate(([0], np.cumsum(weights[order])))
+    return sums[np.searchsorted(times[order], t, side="left")]
+
+
+def _days(arrays: _Arrays, first: Optional[DT.date],
+          last: Optional[DT.date]) -> np.ndarray:
+    """Return an array of the days from first to last inclusive, defaulting
+    to the days spanned by the duties."""
+    if first is None or last is None:
+        if not len(arrays.duty_starts):
+            raise ValueError("No duties to determine date range from")
+        first = first or (_EPOCH + DT.timedelta(
+            minutes=int(arrays.duty_starts.min()))).date()
+        last = last or (_EPOCH + DT.timedelta(
+            minutes=int(arrays.duty_ends.max()) - 1)).date()
+    return np.arange(np.datetime64(first, "D"), np.datetime64(last, "D") + 1)
+
+
+def _totals(arrays: _Arrays, days: np.ndarray, window: int) -> Totals:
+    day_numbers = days.astype(np.int64)
+    #minute boundaries at the end of each day and the start of its window
+    ends = (day_numbers + 1) * _DAY_MINUTES
+    starts = ends - window * _DAY_MINUTES
+    def window_sum(func, *args):
+        return func(*args, ends) - func(*args, starts)
+    block_starts = arrays.block_starts
+    return Totals(
+        days,
+        window_sum(_covered, arrays.duty_starts, arrays.duty_ends),
+        window_sum(_covered, block_starts, arrays.block_ends),
+        window_sum(_counted, block_starts,
+                   np.ones(len(block_starts), dtype=np.int64)),
+        window_sum(_counted, block_starts, arrays.night))
+
+
+def rolling_totals(duties: Iterable[Duty],
+                   windows: Sequence[int] = (7, 28, 365),
+                   first: Optional[DT.date] = None,
+                   last: Optional[DT.date] = None,
+                   night: bool = True
+) -> Dict[int, Totals]:
+    """Calculate rolling window totals for every day in a range.
+
+    :param duties: The duties to total, in any order.
+    :param windows: The window lengths in days.
+    :param first: The first day of the range. Defaults to the day of the
+        earliest duty start.
+    :param last: The last day of the range. Defaults to the day of the
+        latest duty finish.
+    :param night: If False, night time is not calculated, and its totals
+        are zero. Night time calculation is the expensive part of building
+        the arrays.
+
+    :return: A dictionary mapping each window length to a Totals object.
+        Windows include duties from before first where they overlap.
+    """
+    arrays = _arrays(duties, night)
+    days = _days(arrays, first, last)
+    return {X: _totals(arrays, days, X) for X in windows}
+
+
+def daily_totals(duties: Iterable[Duty],
+                 first: Optional[DT.date] = None,
+                 last: Optional[DT.date] = None,
+                 night: bool = True
+) -> Totals:
+    """Calculate the totals for each day in a range.
+
+    Parameters are as for rolling_totals.
+    """
+    return rolling_totals(duties, (1,), first, last, night)[1]
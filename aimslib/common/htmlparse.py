@@ -0,0 +1,77 @@
+"""
+Support for the single pass html.parser based parsers of AIMS pages.
+
+StackParser - an HTMLParser that tracks the open elements
+
+AIMS pages are not well formed: end tags are sometimes missing or do not
+match any open element. StackParser recovers from this in the same way for
+every parser, so that they agree on which element contains which.
+"""
+
+from html.parser import HTMLParser
+from typing import List, Tuple, Optional, Any
+
+
+#elements that never have content or an end tag
+VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr"})
+
+
+class StackParser(HTMLParser):
+    """HTMLParser that keeps a stack of the currently open elements.
+
+    Subclasses override start_element and end_elements rather than
+    handle_starttag and handle_endtag. Each entry of self.stack is a tuple
+    of the element's tag and the value returned by start_element for it.
+
+    An end tag closes the most recently opened element with the same tag,
+    along with any elements opened after it. An end tag that does not match
+    an open element is ignored. Void elements are not added to the stack.
+    """
+
+    def __init__(self) -> None:
+        HTMLParser.__init__(self)
+        self.stack: List[Tuple[str, Any]] = []
+
+
+    def handle_starttag(self, tag: str,
+                        attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in VOID_ELEMENTS: return
+        value = self.start_element(tag, attrs)
+        self.stack.append((tag, value))
+
+
+    def handle_endtag(self, tag: str) -> None:
+        stack = self.stack
+        for c in range(len(stack) - 1, -1, -1):
+            if stack[c][0] == tag: break
+        else:
+            return #no matching start tag, so ignore
+        values = [X[1] for X in stack[c:]]
+        del stack[c:]
+        self.end_elements(values, c)
+
+
+    def start_element(self, tag: str,
+                      attrs: List[Tuple[str, Optional[str]]]) -> Any:
+        """Called for the start tag of each non-void element.
+
+        :param tag: The element's tag.
+        :param attrs: The element's attributes as (name, value) pairs.
+
+        :return: A value to be stored with the element on the stack. The
+            stack does not yet include the element, so self.stack[-1] is
+            its parent.
+        """
+        return None
+
+
+    def end_elements(self, values: List[Any], depth: int) -> None:
+        """Called when elements are closed by an end tag.
+
+        :param values: The values stored with the closed elements, outermost
+            first.
+        :param depth: The position that the outermost closed element had
+            in the stack.
+        """
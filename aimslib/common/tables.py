@@ -0,0 +1,301 @@
+"""
+Compact columnar containers for large collections of sectors and duties.
+
+SectorTable - a sequence of Sector objects
+DutyTable - a sequence of Duty objects
+
+Each field is held in an array rather than as a Python object per field per
+sector. Datetimes are stored as integer minutes since the Unix epoch,
+strings are stored as indexes into string stores shared by the table (and any
+slices of it), and flags are stored as their integer value. Strings that
+commonly repeat, such as airports and registrations, are interned. Strings
+that are mostly unique, such as crew list ids, are stored end to end as UTF-8
+to avoid the overhead of a Python object per string. Items are converted back
+to Sector and Duty objects as they are accessed, and compare equal to the
+objects the table was built from.
+
+Datetimes must be naive and have no seconds or microseconds, which is the
+case for all datetimes produced by aimslib.
+"""
+
+import datetime as DT
+import array
+from collections.abc import Sequence
+from typing import (
+    List, Dict, Optional, Iterable, Iterator, Union, NamedTuple, overload)
+
+from aimslib.common.types import Sector, SectorFlags, Duty, TripID
+
+
+_EPOCH = DT.datetime(1970, 1, 1)
+_MINUTE = DT.timedelta(minutes=1)
+_NO_TIME = -2 ** 31 #represents None in a time column
+_NO_STR = -1 #represents None in a string column
+
+#how the sectors field of a Duty was stored, so that it can be recreated
+_SECTORS_NONE, _SECTORS_LIST, _SECTORS_TUPLE = range(3)
+
+
+class _StringPool:
+
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self.indexes: Dict[str, int] = {}
+
+
+    def add(self, s: Optional[str]) -> int:
+        if s is None: return _NO_STR
+        idx = self.indexes.get(s)
+        if idx is None:
+            idx = self.indexes[s] = len(self.strings)
+            self.strings.append(s)
+        return idx
+
+
+    def get(self, idx: int) -> Optional[str]:
+        return None if idx == _NO_STR else self.strings[idx]
+
+
+class _StringHeap:
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.ends = array.array("I")
+
+
+    def add(self, s: Optional[str]) -> int:
+        if s is None: return _NO_STR
+        self.data += s.encode("utf-8", "surrogatepass")
+        self.ends.append(len(self.data))
+        return len(self.ends) - 1
+
+
+    def get(self, idx: int) -> Optional[str]:
+        if idx == _NO_STR: return None
+        start = self.ends[idx - 1] if idx else 0
+        return self.data[start:self.ends[idx]].decode("utf-8", "surrogatepass")
+
+
+class _Strings(NamedTuple):
+    pool: _StringPool
+    heap: _StringHeap
+
+
+def _to_minutes(d: Optional[DT.datetime]) -> int:
+    if d is None: return _NO_TIME
+    if d.tzinfo or d.second or d.microsecond:
+        raise ValueError(f"Cannot store {d!r} in a table")
+    return (d - _EPOCH) // _MINUTE
+
+
+def _from_minutes(m: int) -> Optional[DT.datetime]:
+    if m == _NO_TIME: return None
+    return _EPOCH + DT.timedelta(minutes=m)
+
+
+class SectorTable(Sequence):
+    """A compact sequence of Sector objects.
+
+    :param sectors: The initial contents of the table.
+    :param strings: String stores to share. Only for use within this
+        module.
+    """
+
+    _POOL_FIELDS = ("name", "from_", "to", "reg", "type_")
+    _HEAP_FIELDS = ("crewlist_id",)
+    _TIME_FIELDS = ("sched_start", "sched_finish", "act_start", "act_finish")
+
+    def __init__(self, sectors: Iterable[Sector] = (),
+                 strings: Optional[_Strings] = None) -> None:
+        self._strings = strings or _Strings(_StringPool(), _StringHeap())
+        self._columns: Dict[str, array.array] = {}
+        for field in self._POOL_FIELDS + self._HEAP_FIELDS + self._TIME_FIELDS:
+            self._columns[field] = array.array("i")
+        self._columns["flags"] = array.array("B")
+        self.extend(sectors)
+
+
+    def append(self, sector: Sector) -> None:
+        """Add a Sector object to the end of the table."""
+        c = self._columns
+        pool, heap = self._strings
+        for field in self._POOL_FIELDS:
+            c[field].append(pool.add(getattr(sector, field)))
+        for field in self._HEAP_FIELDS:
+            c[field].append(heap.add(getattr(sector, field)))
+        for field in self._TIME_FIELDS:
+            c[field].append(_to_minutes(getattr(sector, field)))
+        c["flags"].append(sector.flags.value)
+
+
+    def extend(self, sectors: Iterable[Sector]) -> None:
+        """Add Sector objects to the end of the table."""
+        for sector in sectors:
+            self.append(sector)
+
+
+    def __len__(self) -> int:
+        return len(self._columns["flags"])
+
+
+    @overload
+    def __getitem__(self, idx: int) -> Sector: ...
+    @overload
+    def __getitem__(self, idx: slice) -> "SectorTable": ...
+    def __getitem__(self, idx: Union[int, slice]
+    ) -> Union[Sector, "SectorTable"]:
+        c = self._columns
+        if isinstance(idx, slice):
+            table = SectorTable(strings=self._strings)
+            table._columns = {K: V[idx] for K, V in c.items()}
+            return table
+        get = self._strings.pool.get
+        return Sector(
+            get(c["name"][idx]), get(c["from_"][idx]), get(c["to"][idx]),
+            _from_minutes(c["sched_start"][idx]),
+            _from_minutes(c["sched_finish"][idx]),
+            _from_minutes(c["act_start"][idx]),
+            _from_minutes(c["act_finish"][idx]),
+            get(c["reg"][idx]), get(c["type_"][idx]),
+            SectorFlags(c["flags"][idx]),
+            self._strings.heap.get(c["crewlist_id"][idx]))
+
+
+    def __iter__(self) -> Iterator[Sector]:
+        for c in range(len(self)):
+            yield self[c]
+
+
+    def column(self, field: str) -> array.array:
+        """Return the array backing a time or flags field.
+
+        :param field: One of sched_start, sched_finish, act_start,
+            act_finish or flags.
+
+        :return: The array of values. Times are minutes since the Unix epoch,
+            with missing times represented by -2**31.
+        """
+        if field not in self._TIME_FIELDS + ("flags",):
+            raise KeyError(field)
+        return self._columns[field]
+
+
+    def nbytes(self) -> int:
+        """Return the approximate memory used by the table's arrays."""
+        return sum(X.itemsize * len(X) for X in self._columns.values())
+
+
+class DutyTable(Sequence):
+    """A compact sequence of Duty objects.
+
+    :param duties: The initial contents of the table.
+    :param strings: String stores to share. Only for use within this
+        module.
+
+    The sectors of all the duties are held in a single SectorTable, available
+    as the sectors attribute.
+    """
+
+    def __init__(self, duties: Iterable[Duty] = (),
+                 strings: Optional[_Strings] = None) -> None:
+        self._strings = strings or _Strings(_StringPool(), _StringHeap())
+        self.sectors = SectorTable(strings=self._strings)
+        self._columns: Dict[str, array.array] = {
+            "aims_day": array.array("i"),
+            "trip": array.array("i"),
+            "start": array.array("i"),
+            "finish": array.array("i"),
+            "first_sector": array.array("i"),
+            "sector_count": array.array("H"),
+            "sectors_kind": array.array("B"),
+        }
+        self.extend(duties)
+
+
+    def append(self, duty: Duty) -> None:
+        """Add a Duty object to the end of the table."""
+        c = self._columns
+        heap = self._strings.heap
+        c["aims_day"].append(heap.add(duty.trip_id[0]))
+        c["trip"].append(heap.add(duty.trip_id[1]))
+        c["start"].append(_to_minutes(duty.start))
+        c["finish"].append(_to_minutes(duty.finish))
+        c["first_sector"].append(len(self.sectors))
+        if duty.sectors is None:
+            kind = _SECTORS_NONE
+        elif isinstance(duty.sectors, tuple):
+            kind = _SECTORS_TUPLE
+        else:
+            kind = _SECTORS_LIST
+        c["sectors_kind"].append(kind)
+        c["sector_count"].append(len(duty.sectors or ()))
+        self.sectors.extend(duty.sectors or ())
+
+
+    def extend(self, duties: Iterable[Duty]) -> None:
+        """Add Duty objects to the end of the table."""
+        for duty in duties:
+            self.append(duty)
+
+
+    def __len__(self) -> int:
+        return len(self._columns["start"])
+
+
+    @overload
+    def __getitem__(self, idx: int) -> Duty: ...
+    @overload
+    def __getitem__(self, idx: slice) -> "DutyTable": ...
+    def __getitem__(self, idx: Union[int, slice]
+    ) -> Union[Duty, "DutyTable"]:
+        c = self._columns
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                return DutyTable((self[X] for X in range(start, stop, step)),
+                                 self._strings)
+            table = DutyTable(strings=self._strings)
+            table._columns = {K: V[idx] for K, V in c.items()}
+            if stop > start:
+                first = c["first_sector"][start]
+                end = c["first_sector"][stop - 1] + c["sector_count"][stop - 1]
+                table.sectors = self.sectors[first:end]
+                table._columns["first_sector"] = array.array(
+                    "i", (X - first for X in table._columns["first_sector"]))
+            return table
+        get = self._strings.heap.get
+        first = c["first_sector"][idx]
+        sectors = [self.sectors[X]
+                   for X in range(first, first + c["sector_count"][idx])]
+        kind = c["sectors_kind"][idx]
+        sector_seq: Optional[Union[List[Sector], tuple]] = None
+        if kind == _SECTORS_LIST:
+            sector_seq = sectors
+        elif kind == _SECTORS_TUPLE:
+            sector_seq = tuple(sectors)
+        aims_day, trip = get(c["aims_day"][idx]), get(c["trip"][idx])
+        return Duty(TripID(aims_day, trip), #type: ignore
+                    _from_minutes(c["start"][idx]),
+                    _from_minutes(c["finish"][idx]),
+                    sector_seq) #type: ignore
+
+
+    def __iter__(self) -> Iterator[Duty]:
+        for c in range(len(self)):
+            yield self[c]
+
+
+    def column(self, field: str) -> array.array:
+        """Return the array backing the start or finish field.
+
+        :return: The array of values in minutes since the Unix epoch, with
+            missing times represented by -2**31.
+        """
+        if field not in ("start", "finish"): raise KeyError(field)
+        return self._columns[field]
+
+
+    def nbytes(self) -> int:
+        """Return the approximate memory used by the table's arrays."""
+        return (sum(X.itemsize * len(X) for X in self._columns.values())
+                + self.sectors.nbytes())
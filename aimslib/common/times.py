@@ -0,0 +1,116 @@
+"""
+Fast parsing of the time strings found in AIMS pages.
+
+datetime.strptime is slow, and signals that a string is not a time by raising
+an exception, which is expensive when most strings being tested are not
+times. The functions in this module look strings up in tables built at import
+time instead, and return None if the string is not a time. They accept
+exactly the strings that strptime accepts with the equivalent format:
+
+hm - parse "%H:%M" to a time
+hhmm - parse "%H%M" to a time
+hm_delta - parse "%H:%M" or "24:00" to an offset from midnight
+hhmm_delta - parse "HHMM" or "HHMM+d" to an offset from midnight
+"""
+
+import datetime as dt
+from typing import Dict, Optional
+
+
+def _build_tables():
+    hm: Dict[str, dt.time] = {}
+    hhmm: Dict[str, dt.time] = {}
+    for h in range(24):
+        for m in range(60):
+            t = dt.time(h, m)
+            for h_str in {str(h), f"{h:02d}"}:
+                for m_str in {str(m), f"{m:02d}"}:
+                    hm[f"{h_str}:{m_str}"] = t
+    #Without a separator some strings are ambiguous, e.g. "123" could be
+    #01:23 or 12:03. strptime tries two digit hours first, so write one
+    #digit hours first and let two digit hours overwrite them.
+    for h_fmt in ("{}", "{:02d}"):
+        for h in range(24):
+            h_str = h_fmt.format(h)
+            if h_fmt == "{}" and len(h_str) == 2: continue
+            for m in range(60):
+                for m_str in {str(m), f"{m:02d}"}:
+                    hhmm[h_str + m_str] = dt.time(h, m)
+    hm_delta = {K: dt.timedelta(hours=V.hour, minutes=V.minute)
+                for K, V in hm.items()}
+    hm_delta["24:00"] = dt.timedelta(days=1)
+    hhmm_delta: Dict[str, dt.timedelta] = {}
+    for k, v in hhmm.items():
+        if len(k) != 4: continue
+        delta = dt.timedelta(hours=v.hour, minutes=v.minute)
+        hhmm_delta[k] = delta
+        for d in range(10):
+            hhmm_delta[f"{k}+{d}"] = delta + dt.timedelta(days=d)
+    return hm, hhmm, hm_delta, hhmm_delta
+
+
+_HM, _HHMM, _HM_DELTA, _HHMM_DELTA = _build_tables()
+
+
+def _strptime(s: str, format_: str) -> Optional[dt.time]:
+    #the tables only hold ASCII digits, but strptime also accepts some other
+    #Unicode decimal digits
+    try:
+        return dt.datetime.strptime(s, format_).time()
+    except ValueError:
+        return None
+
+
+def hm(s: str) -> Optional[dt.time]:
+    """Parse a string of the form H:M, as strptime(s, "%H:%M").
+
+    :param s: The string to parse.
+
+    :return: A time, or None if s is not a valid time.
+    """
+    t = _HM.get(s)
+    if t is None and not s.isascii():
+        return _strptime(s, "%H:%M")
+    return t
+
+
+def hhmm(s: str) -> Optional[dt.time]:
+    """Parse a string of the form HHMM, as strptime(s, "%H%M").
+
+    :param s: The string to parse.
+
+    :return: A time, or None if s is not a valid time.
+    """
+    t = _HHMM.get(s)
+    if t is None and not s.isascii():
+        return _strptime(s, "%H%M")
+    return t
+
+
+def hm_delta(s: str) -> Optional[dt.timedelta]:
+    """As hm, but also accept the non-existent time "24:00" used by AIMS.
+
+    :param s: The string to parse.
+
+    :return: The time as an offset from midnight, or None if s is not a
+        valid time. "24:00" returns an offset of one day.
+    """
+    delta = _HM_DELTA.get(s)
+    if delta is None and not s.isascii():
+        t = _strptime(s, "%H:%M")
+        if t is not None:
+            delta = dt.timedelta(hours=t.hour, minutes=t.minute)
+    return delta
+
+
+def hhmm_delta(s: str) -> Optional[dt.timedelta]:
+    """Parse a string of the form HHMM or HHMM+d, as used for scheduled
+    times in trip sheets.
+
+    :param s: The string to parse. The hours and minutes must be two digits
+        each, and d is a single digit number of days.
+
+    :return: The time as an offset from midnight, or None if s is not a
+        valid time.
+    """
+    return _HHMM_DELTA.get(s)
@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+"""
+Batch processing of AIMS detailed roster files across a process pool.
+
+process - process files, yielding a BatchResult for each one
+main - command line interface
+
+Example command line usage:
+
+    python3 -m aimslib.detailed_roster.batch -o OUTDIR ROSTER_DIR
+"""
+
+import os
+import sys
+import json
+import argparse
+import concurrent.futures
+from typing import (
+    NamedTuple, List, Dict, Tuple, Optional, Iterable, Iterator, Union)
+
+import aimslib.detailed_roster.process as p
+from aimslib.common.types import Duty, CrewMember
+
+
+CHUNKSIZE = 8
+
+
+class BatchResult(NamedTuple):
+    filename: str
+    duties: Optional[List[Duty]]
+    crew: Optional[Dict[str, Tuple[CrewMember, ...]]]
+    error: Optional[str]
+
+
+def _files(source: Union[str, Iterable[str]]) -> List[str]:
+    if isinstance(source, str):
+        return sorted(X.path for X in os.scandir(source) if X.is_file())
+    return list(source)
+
+
+def _process_file(filename: str) -> BatchResult:
+    try:
+        with open(filename, encoding="utf-8", errors="replace") as f:
+            roster = f.read()
+        parsed = p.ParsedRoster(roster)
+        duties = parsed.duties()
+        crew = parsed.crew()
+    #malformed input can fail in any number of ways before a roster specific
+    #check is reached, and one bad file must not abort the whole batch
+    except Exception as e:
+        return BatchResult(filename, None, None, f"{type(e).__name__}: {e}")
+    return BatchResult(filename, duties, crew, None)
+
+
+def process(source: Union[str, Iterable[str]],
+            max_workers: Optional[int] = None,
+            chunksize: int = CHUNKSIZE
+) -> Iterator[BatchResult]:
+    """Extract duties and crew from many detailed roster files.
+
+    :param source: Either the path of a directory, in which case every file
+        in the directory is processed, or an iterable of file paths.
+    :param max_workers: The number of worker processes. None means the
+        number of processors on the machine.
+    :param chunksize: The number of files sent to a worker process at a
+        time. Larger chunks reduce inter-process overhead at the expense of
+        less even load balancing.
+
+    :yields: A BatchResult for each file, in the order the files were given
+        (sorted by path for a directory). If a file could not be processed,
+        duties and crew are None and error describes the problem; the
+        remaining files are still processed.
+    """
+    files = _files(source)
+    if not files: return
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        yield from executor.map(_process_file, files, chunksize=chunksize)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Extract duties and crew from AIMS detailed rosters.")
+    parser.add_argument("source", nargs="+",
+                        help="Roster files, or a single directory of them")
+    parser.add_argument("-o", "--outdir", default=".",
+                        help="Directory in which to write results as JSON")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE,
+                        help="Number of files sent to a worker at a time")
+    args = parser.parse_args(argv)
+    source: Union[str, List[str]] = args.source
+    if len(args.source) == 1 and os.path.isdir(args.source[0]):
+        source = args.source[0]
+    os.makedirs(args.outdir, exist_ok=True)
+    errors = 0
+    for result in process(source, args.jobs, args.chunksize):
+        if result.error:
+            errors += 1
+            print(f"{result.filename}: {result.error}", file=sys.stderr)
+            continue
+        basename = os.path.splitext(os.path.basename(result.filename))[0]
+        with open(os.path.join(args.outdir, basename + ".json"), "w") as f:
+            json.dump((result.duties, result.crew), f,
+                      default=lambda o: str(o), indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
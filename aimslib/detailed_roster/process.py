@@ -20,10 +20,12 @@
 import re
 import datetime as dt
 from html.parser import HTMLParser
-from typing import List, Dict, Tuple, Union, NamedTuple
+from typing import (
+    List, Dict, Tuple, Union, NamedTuple, Hashable, Any, Optional)
 import enum
 
 import aimslib.common.types as T
+import aimslib.common.times as times
 
 
 class Break(enum.Enum):
@@ -50,6 +52,12 @@ Column = List[str]
 Line = List[str]
 
 
+#In "strict" mode, every element of the streams passed between the stages of
+#processing is checked. In "fast" mode these checks are skipped, and the
+#streams are assumed to be well formed.
+VALIDATION = "strict" #or "fast"
+
+
 class DetailedRosterException(Exception):
 
     def __str__(self):
@@ -68,6 +76,20 @@ class CrewFormatException(DetailedRosterException):
     "Crew section with unexpected format found."
 
 
+def _validate(seq, test, what: str, start: int=0) -> None:
+    """Check that test(X) is True for every element X of seq[start:].
+
+    Only carried out if VALIDATION is "strict".
+
+    :raises AssertionError: Identifies the index of the first element that
+        fails the test.
+    """
+    if VALIDATION == "fast": return
+    for c in range(start, len(seq)):
+        if not test(seq[c]):
+            raise AssertionError(f"{what} {c} is invalid: {seq[c]!r}")
+
+
 class RosterParser(HTMLParser):
 
     def __init__(self):
@@ -178,43 +200,37 @@ def basic_stream(date: dt.date, columns: List[Column]
         assert isinstance(col, (list, tuple))
         if len(col) < 2: continue
         if col[0] == "": break #column has no header means we're finished
-        assert False not in [isinstance(X, str) for X in col[1:]]
+        _validate(col, lambda X: isinstance(X, str), "Column entry", 1)
+        datetime_indexes = []
+        midnight = dt.datetime.combine(date, dt.time(0, 0))
         for entry in col[1:]:
             if entry == "":
                 if not isinstance(stream[-1], Break):
                     stream.append(Break.LINE)
-            #bug workaround: roster uses non-existent time "24:00"
-            elif entry == "24:00":
-                stream.append(
-                    dt.datetime.combine(
-                        date + dt.timedelta(days=1),
-                        dt.time(0, 0)))
-            else:
-                try: #try to treat entry like a time
-                    time = dt.datetime.strptime(entry, "%H:%M").time()
-                    stream.append(dt.datetime.combine(date, time))
-                except ValueError: #if that fails, treat it like a string
-                    stream.append(DStr(date, entry))
+                continue
+            #try to treat entry like a time. hm_delta also handles the
+            #non-existent time "24:00" that the roster uses.
+            delta = times.hm_delta(entry)
+            if delta is not None:
+                datetime_indexes.append(len(stream))
+                stream.append(midnight + delta)
+            else: #if that fails, treat it like a string
+                stream.append(DStr(date, entry))
         date += dt.timedelta(days=1)
         #remove trailing line break
         if isinstance(stream[-1], Break): del stream[-1]
+        #there is a corner case where a sector finish time is dragged into
+        #the next column by a duty time finishing after midnight, and another
+        #where a sector time uses 24:00 as a start time but advances this to
+        #where 00:00 should correctly sit. To counteract these cases, make
+        #sure datetimes only ever decrease when the column is read backwards.
+        last_datetime = dt.datetime(9999, 1, 1)
+        for c in reversed(datetime_indexes):
+            if stream[c] > last_datetime:
+                stream[c] -= dt.timedelta(days=1)
+            last_datetime = stream[c]
         #append the column break
         stream.append(Break.COLUMN)
-    #there is a corner case where a sector finish time is dragged into the next
-    #column by a duty time finishing after midnight, and another where a sector
-    #time uses 24:00 as a start time but advances this to where 00:00 should
-    #correctly sit. To counteract these cases, make sure datetimes in a reversed
-    #stream only ever decrease.
-    stream.reverse()
-    for c, event in enumerate(stream):
-        if isinstance(event, Break) and event == Break.COLUMN:
-            last_datetime = dt.datetime(9999, 1, 1)
-        elif isinstance(event, dt.datetime):
-            if event > last_datetime:
-                event -= dt.timedelta(days=1)
-                stream[c] = event
-            last_datetime = event
-    stream.reverse()
     return stream
 
 
@@ -228,50 +244,50 @@ def duty_stream(bstream):
          where the Break objects are either Break.SECTOR or Break.DUTY
     """
     assert isinstance(bstream, (list, tuple))
-    assert False not in [isinstance(X, (DStr, Break, dt.datetime))
-                         for X in bstream]
-    assert False not in [X in (Break.LINE, Break.COLUMN) for X in bstream
-                         if isinstance(X, Break)]
+    _validate(bstream,
+              lambda X: (isinstance(X, (DStr, dt.datetime)) or
+                         X in (Break.LINE, Break.COLUMN)),
+              "Basic stream element")
     assert bstream[0] == Break.COLUMN and bstream[-1] == Break.COLUMN
-    dstream = bstream[:]
-    #Remove single DStr surrounded by Breaks
-    for c in range(1, len(dstream) - 1):
-        if (isinstance(dstream[c], DStr) and
-            isinstance(dstream[c - 1], Break) and
-            isinstance(dstream[c + 1], Break)):
-            dstream[c] = None
-            dstream[c - 1] = None
-    dstream = [X for X in dstream if X]
-
-    #if a dt.datetime follows a column break, remove the break
-    for c in range(1, len(dstream) - 1):
-        if dstream[c] == Break.COLUMN and isinstance(dstream[c + 1], dt.datetime):
-            dstream[c] = None
-    dstream = [X for X in dstream if X]
-
-    #clean up sector blocks, including column break removal
+    dstream: RosterStream = []
+    append = dstream.append
+
+    #clean up sector blocks, including column break removal. A sector block
+    #starts with a "from" DStr preceded by a datetime and ends with a "to"
+    #DStr followed by a datetime.
+    it = _pruned(bstream)
+    prev = next(it, None) #None indicates that prev has been removed
+    cur = next(it, None)
     in_sector = False
-    for c in range(1, len(dstream) - 1):
-        if in_sector:
-            if dstream[c] == Break.LINE: raise SectorFormatException
-            if (isinstance(dstream[c], DStr) and
-                isinstance(dstream[c + 1], dt.datetime)): #"to" found
+    after_to = False #if True, remove DStr objects up to next Break object
+    for nxt in it:
+        removed = False
+        if after_to:
+            if isinstance(cur, Break):
+                after_to = False
+            elif isinstance(cur, DStr):
+                removed = True
+        if removed:
+            pass
+        elif in_sector:
+            if cur is Break.LINE: raise SectorFormatException
+            if (isinstance(cur, DStr) and
+                isinstance(nxt, dt.datetime)): #"to" found
                 in_sector = False
-                #remove any DStr up to next Break object
-                i = c + 2
-                while not isinstance(dstream[i], Break):
-                    if isinstance(dstream[i], DStr):
-                        dstream[i] = None
-                    i += 1
+                after_to = True
             else:
-                dstream[c] = None #remove column breaks and extra DStrs
-        else: #not in sector
-            if isinstance(dstream[c], DStr):
-                if isinstance(dstream[c - 1], dt.datetime): #"from" found
-                    in_sector = True
-                elif isinstance(dstream[c - 1], DStr):
-                    dstream[c - 1] = None #remove extra DStrs at start of block
-    dstream = [X for X in dstream if X]
+                removed = True #remove column breaks and extra DStrs
+        elif isinstance(cur, DStr):
+            if isinstance(prev, dt.datetime): #"from" found
+                in_sector = True
+            elif isinstance(prev, DStr):
+                prev = None #remove extra DStrs at start of block
+        if prev is not None: append(prev)
+        prev = None if removed else cur
+        cur = nxt
+    if prev is not None: append(prev)
+    if cur is not None and not (after_to and isinstance(cur, DStr)):
+        append(cur)
 
     #remaining Break objects are either duty breaks if separated by more
     #than 8 hours, else they are sector breaks
@@ -285,7 +301,33 @@ def duty_stream(bstream):
                 dstream[c] = Break.DUTY
             else:
                 dstream[c] = Break.SECTOR
-    return dstream[1:-1]
+    del dstream[:1]
+    del dstream[-1:]
+    return dstream
+
+
+def _pruned(bstream):
+    """Iterate over bstream, skipping single DStr objects surrounded by
+    Breaks along with the first of these Breaks, and skipping column breaks
+    that are followed by a datetime."""
+    last = len(bstream) - 1
+    first = True
+    skip = False
+    for c, entry in enumerate(bstream):
+        if skip: #the DStr of a single DStr surrounded by Breaks
+            skip = False
+            continue
+        if isinstance(entry, Break) and c < last:
+            nxt = bstream[c + 1]
+            if (isinstance(nxt, DStr) and c + 1 < last and
+                isinstance(bstream[c + 2], Break)):
+                skip = True
+                continue
+            if (not first and entry is Break.COLUMN and
+                isinstance(nxt, dt.datetime)):
+                continue
+        first = False
+        yield entry
 
 
 def _duty(stream):
@@ -298,8 +340,8 @@ def _duty(stream):
     :returns: An aimslib Duty object
     """
     assert isinstance(stream, (list, tuple))
-    assert False not in [type(X) in (DStr, dt.datetime, Break)
-                         for X in stream]
+    _validate(stream, lambda X: type(X) in (DStr, dt.datetime, Break),
+              "Duty stream element")
     if len(stream) <= 1: return None #empty stream or some sort of day off
     #the end of the last duty may not be included on the roster if it finishes
     #after midnight. For consistency, fake the end of this duty if necessary
@@ -386,8 +428,8 @@ def _clean_name(name: str) -> str:
     return " ".join([X.strip().capitalize() for X in name.split()])
 
 
-def _crew_strings(roster:str) -> List[str]:
-    lines_ = lines(roster)
+def _crew_strings(roster: Union[str, List[Line]]) -> List[str]:
+    lines_ = lines(roster) if isinstance(roster, str) else roster
     #find header of crew table
     for c, l in enumerate(lines_):
         if not l: continue
@@ -399,9 +441,14 @@ def _crew_strings(roster:str) -> List[str]:
     return lines_[c + 1][0].replace(" ", " ").splitlines()
 
 
-def crew(roster: str, duties: List[T.Duty]=[]
+def crew(roster: Union[str, List[Line]], duties: List[T.Duty]=[]
 ) -> Dict[str, Tuple[T.CrewMember, ...]]:
     """Extract the crew lists from the text of an AIMS detailed roster.
+
+    :param roster: The text of the roster, or the output of lines() if it
+        has already been parsed.
+    :param duties: The duties of the roster, used to assign crew listed
+        against "All" flights of a day to the sectors of that day.
     """
     #create a mapping of the form {allkey: [crewlist_id1, ...], } to allow
     #crew with flights listed as all to be assigned to sector ids.
@@ -446,8 +493,13 @@ def crew(roster: str, duties: List[T.Duty]=[]
     return retval
 
 
-def duties(s: str) -> List[T.Duty]:
-    l = lines(s)
+def duties(s: Union[str, List[Line]]) -> List[T.Duty]:
+    """Extract the duties from the text of an AIMS detailed roster.
+
+    :param s: The text of the roster, or the output of lines() if it has
+        already been parsed.
+    """
+    l = lines(s) if isinstance(s, str) else s
     bstream = basic_stream(extract_date(l), columns(l))
     duty_streams = [[]]
     for e in duty_stream(bstream):
@@ -460,3 +512,103 @@ def duties(s: str) -> List[T.Duty]:
         duty = _duty(stream)
         if duty: dutylist.append(duty)
     return dutylist
+
+
+class ParsedRoster:
+    """An AIMS detailed roster, parsed once for all extractions.
+
+    :param roster: The text of an AIMS detailed roster.
+
+    The HTML is parsed when the object is created, and the duty list is
+    built on first use, so extracting both duties and crew only parses the
+    roster once.
+    """
+
+    def __init__(self, roster: str) -> None:
+        self.lines = lines(roster)
+        self._duties: Optional[List[T.Duty]] = None
+
+
+    def duties(self) -> List[T.Duty]:
+        """Return the duties of the roster, as for duties()."""
+        if self._duties is None:
+            self._duties = duties(self.lines)
+        return self._duties
+
+
+    def crew(self) -> Dict[str, Tuple[T.CrewMember, ...]]:
+        """Return the crew lists of the roster, as for crew()."""
+        return crew(self.lines, self.duties())
+
+
+class RosterDiff(NamedTuple):
+    """The differences between two duty lists.
+
+    Duties are matched by trip_id, with duties that share a trip_id (e.g. a
+    standby and a flight duty on the same day) matched in order of
+    occurrence. Sectors are matched by crewlist_id, or by name and scheduled
+    start for sectors without a crewlist_id. Modified entries are (old, new)
+    tuples.
+    """
+    added_duties: List[T.Duty]
+    removed_duties: List[T.Duty]
+    modified_duties: List[Tuple[T.Duty, T.Duty]]
+    added_sectors: List[T.Sector]
+    removed_sectors: List[T.Sector]
+    modified_sectors: List[Tuple[T.Sector, T.Sector]]
+
+
+def _sector_key(sector: T.Sector) -> Hashable:
+    if sector.crewlist_id: return sector.crewlist_id
+    return (sector.name, sector.sched_start)
+
+
+def _duty_keys(duties: List[T.Duty]) -> Dict[Hashable, T.Duty]:
+    #the nth duty with a given trip_id is keyed (trip_id, n)
+    counts: Dict[T.TripID, int] = {}
+    keyed = {}
+    for duty in duties:
+        n = counts.get(duty.trip_id, 0)
+        counts[duty.trip_id] = n + 1
+        keyed[(duty.trip_id, n)] = duty
+    return keyed
+
+
+def _changes(old: Dict[Hashable, Any], new: Dict[Hashable, Any]
+) -> Tuple[List, List, List]:
+    added = [V for K, V in new.items() if K not in old]
+    removed = [V for K, V in old.items() if K not in new]
+    modified = [(old[K], V) for K, V in new.items()
+                if K in old and old[K] != V]
+    return added, removed, modified
+
+
+def diff_duties(old: List[T.Duty], new: List[T.Duty]) -> RosterDiff:
+    """Find the differences between two duty lists.
+
+    :param old: The previous list of Duty objects.
+    :param new: The current list of Duty objects.
+
+    :returns: A RosterDiff object. Added and modified entries are in the
+        order of new, removed entries in the order of old.
+
+    Matching is done with dictionaries, so the cost is linear in the total
+    number of duties and sectors.
+    """
+    old_sectors, new_sectors = [
+        {_sector_key(S): S for D in X if D.sectors for S in D.sectors}
+        for X in (old, new)]
+    return RosterDiff(
+        *_changes(_duty_keys(old), _duty_keys(new)),
+        *_changes(old_sectors, new_sectors))
+
+
+def diff(old_roster: str, new_roster: str) -> RosterDiff:
+    """Find the differences between two AIMS detailed rosters.
+
+    :param old_roster: The HTML of the previous detailed roster.
+    :param new_roster: The HTML of the current detailed roster.
+
+    :returns: A RosterDiff object, as for diff_duties.
+    """
+    return diff_duties(duties(old_roster), duties(new_roster))
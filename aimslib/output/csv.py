@@ -1,53 +1,128 @@
 import csv as libcsv
 import io
 import datetime
-from typing import List, Dict
+import concurrent.futures
+from typing import List, Dict, Optional, Iterable, TextIO
 
-from aimslib.common.types import Duty, CrewMember, SectorFlags
+from aimslib.common.types import Duty, CrewMember, SectorFlags, Sector
 import nightflight.night as nightcalc
 from nightflight.airport_nvecs import airfields as nvecs
 
-def csv(duties: List[Duty], crews: Dict[str, List[CrewMember]], fo:bool
+
+def _night_duration(sector: Sector) -> Optional[float]:
+    try:
+        return nightcalc.night_duration(
+            nvecs[sector.from_], nvecs[sector.to],
+            sector.act_start, sector.act_finish)
+    except KeyError: #raised by nvecs if airfields not found
+        return None
+
+
+def night_fraction(sector: Sector) -> Optional[float]:
+    """Return the fraction of a sector's actual block time that is at night.
+
+    :param sector: A sector with actual start and finish times.
+
+    :return: The fraction rounded to three decimal places, or None if the
+        location of either airfield is not known.
+    """
+    night = _night_duration(sector)
+    if night is None: return None
+    duration = (sector.act_finish - sector.act_start).total_seconds() / 60
+    return round(night / duration, 3)
+
+
+def night_fractions(sectors: Iterable[Sector], max_workers: int = 0
+) -> List[Optional[float]]:
+    """Batch version of night_fraction.
+
+    :param sectors: Sectors with actual start and finish times.
+    :param max_workers: If greater than zero, night fractions are calculated
+        in a pool of this many processes.
+
+    :return: A list of the night fractions of sectors, in the same order.
+    """
+    sectors = list(sectors)
+    if max_workers > 0 and len(sectors) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+            return list(executor.map(night_fraction, sectors, chunksize=64))
+    return [night_fraction(X) for X in sectors]
+
+
+def _logbook_sectors(duties: Iterable[Duty]) -> Iterable[Sector]:
+    for duty in duties:
+        if not duty.sectors: continue
+        for sector in duty.sectors:
+            if (sector.flags != SectorFlags.NONE or
+                not (sector.act_start and sector.act_finish)): continue
+            yield sector
+
+
+def csv(duties: List[Duty], crews: Dict[str, List[CrewMember]], fo:bool,
+        max_workers: int = 0
 ) -> str:
+    """Create a logbook CSV file from a duty list.
+
+    :param duties: The duties to include.
+    :param crews: A mapping of crewlist_id to crew list.
+    :param fo: True if the logbook owner is a first officer.
+    :param max_workers: If greater than zero, night fractions are calculated
+        for all sectors at once with night_fractions, using this many
+        processes. Otherwise each is calculated as its row is written.
+
+    :return: The CSV file as a string.
+    """
     output = io.StringIO(newline='')
+    write_csv(duties, crews, fo, output, max_workers)
+    return output.getvalue()
+
+
+def write_csv(duties: Iterable[Duty], crews: Dict[str, List[CrewMember]],
+              fo: bool, f: TextIO, max_workers: int = 0
+) -> None:
+    """Write a logbook CSV file to a file-like object, a row at a time.
+
+    :param duties: The duties to include. May be a generator, in which case
+        memory use does not grow with the number of duties, unless
+        max_workers is used.
+    :param crews: A mapping of crewlist_id to crew list.
+    :param fo: True if the logbook owner is a first officer.
+    :param f: The text file to write to. Files should be opened with
+        newline=''.
+    :param max_workers: As for csv. The batched calculation needs all the
+        sectors at once, so they are collected into a list first.
+    """
     fieldnames = ['Off Blocks', 'On Blocks', 'Origin', 'Destination',
                   'Registration', 'Type', 'Captain', 'Role', 'Crew', 'Night']
     fieldname_map = (('Off Blocks', 'act_start'), ('On Blocks', 'act_finish'),
                      ('Origin', 'from_'), ('Destination', 'to'),
                      ('Registration', 'reg'), ('Type', 'type_'))
     writer = libcsv.DictWriter(
-        output,
+        f,
         fieldnames=fieldnames,
         extrasaction='ignore',
         dialect='unix')
     writer.writeheader()
-    for duty in duties:
-        if not duty.sectors: continue
-        for sector in duty.sectors:
-            if (sector.flags != SectorFlags.NONE or
-                not (sector.act_start and sector.act_finish)): continue
-            sec_dict = sector._asdict()
-            for fn, sfn in fieldname_map:
-                sec_dict[fn] = sec_dict[sfn]
-            sec_dict['Role'] = 'p1s' if fo else 'p1'
-            crewlist = crews.get(sector.crewlist_id, [])
-            sec_dict['Captain'] = 'Self'
-            if fo and crewlist and crewlist[0].role == 'CP':
-                sec_dict['Captain'] = crewlist[0].name
-            crewstr = "; ".join([f"{X[1]}:{X[0]}" for X in crewlist])
-            if (not sector.type_ and len(sector.crewlist_id) > 3
-                and sector.crewlist_id[-3:] in ("319", "320", "321")):
-                sec_dict['Type'] = f"{sector.crewlist_id[-3:]}"
-            sec_dict['Crew'] = crewstr
-            try:
-                night_duration = nightcalc.night_duration(
-                    nvecs[sector.from_], nvecs[sector.to],
-                    sector.act_start, sector.act_finish)
-                duration = (sector.act_finish - sector.act_start).total_seconds() / 60
-                sec_dict['Night'] = round(night_duration / duration, 3)
-            except KeyError: #raised by nvecs if airfields not found
-                sec_dict['Night'] = ""
-            writer.writerow(sec_dict)
-
-    output.seek(0)
-    return output.read()
+    sectors: Iterable[Sector] = _logbook_sectors(duties)
+    fractions: Optional[List[Optional[float]]] = None
+    if max_workers > 0:
+        sectors = list(sectors)
+        fractions = night_fractions(sectors, max_workers)
+    for c, sector in enumerate(sectors):
+        sec_dict = sector._asdict()
+        for fn, sfn in fieldname_map:
+            sec_dict[fn] = sec_dict[sfn]
+        sec_dict['Role'] = 'p1s' if fo else 'p1'
+        crewlist = crews.get(sector.crewlist_id, [])
+        sec_dict['Captain'] = 'Self'
+        if fo and crewlist and crewlist[0].role == 'CP':
+            sec_dict['Captain'] = crewlist[0].name
+        crewstr = "; ".join([f"{X[1]}:{X[0]}" for X in crewlist])
+        if (not sector.type_ and len(sector.crewlist_id) > 3
+            and sector.crewlist_id[-3:] in ("319", "320", "321")):
+            sec_dict['Type'] = f"{sector.crewlist_id[-3:]}"
+        sec_dict['Crew'] = crewstr
+        fraction = (fractions[c] if fractions is not None
+                    else night_fraction(sector))
+        sec_dict['Night'] = "" if fraction is None else fraction
+        writer.writerow(sec_dict)
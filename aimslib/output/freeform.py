@@ -1,8 +1,14 @@
 #!/usr/bin/python3
 
 import datetime
+import io
 import math
-from typing import List, Dict
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, TextIO
+
+import astral
+import astral.sun
+import nightflight.night as nightcalc
+from nightflight.airport_nvecs import airfields as nvecs
 
 from aimslib.common.types import SectorFlags, Duty, CrewMember
 
@@ -17,7 +23,7 @@ sunrise_maxoffset = (sunrise_dec21 - sunrise_jun21) / 2
 sunrise_mean = sunrise_jun21 + sunrise_maxoffset
 
 
-def _approx_night(d):
+def _calculated_night(d):
     """Returns a tuple consisting of two datetime.time objects
     representing (APPROX_SUNSET, APPROX_SUNRISE) for the date
     represented by datetime.date object D"""
@@ -28,17 +34,125 @@ def _approx_night(d):
     return (sunset.time(), sunrise.time())
 
 
-def freeform(duties: List[Duty], crews: Dict[str, List[CrewMember]]
+#index of the first day of each month in a leap year, by month number
+_MONTH_OFFSETS = (0, 0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335)
+_TABLE_YEAR = 2000 #a leap year, so that the tables have 366 entries
+
+
+def _table_dates():
+    d = datetime.datetime(_TABLE_YEAR, 1, 1)
+    for c in range(366):
+        yield d + datetime.timedelta(days=c)
+
+
+def _day_index(d):
+    return _MONTH_OFFSETS[d.month] + d.day - 1
+
+
+#(APPROX_SUNSET, APPROX_SUNRISE) for each day of the year. The 29th of
+#February, which the calculation cannot handle, takes the 28th's values.
+_NIGHT_TABLE = [_calculated_night(X if (X.month, X.day) != (2, 29)
+                                  else X.replace(day=28))
+                for X in _table_dates()]
+
+
+def _approx_night(d):
+    """Returns a tuple consisting of two datetime.time objects
+    representing (APPROX_SUNSET, APPROX_SUNRISE) for the date
+    represented by datetime.date object D"""
+    return _NIGHT_TABLE[_day_index(d)]
+
+
+#per airfield tables of (SUNSET, SUNRISE), built on first use. None if the
+#location of the airfield is not known.
+_airport_tables: Dict[
+    str, Optional[List[Tuple[datetime.time, datetime.time]]]] = {}
+
+
+def _airport_entry(observer, d):
+    try:
+        sunset = astral.sun.sunset(observer, d)
+        sunrise = astral.sun.sunrise(observer, d)
+        return (sunset.time(), sunrise.time())
+    except ValueError: #raised if the sun does not rise or set on the day
+        noon = astral.sun.noon(observer, d)
+        if astral.sun.elevation(observer, noon) > 0:
+            return (datetime.time.max, datetime.time.min) #never night
+        return (datetime.time.min, datetime.time.max) #always night
+
+
+def _airport_night(airport, d):
+    """Returns a tuple consisting of two datetime.time objects
+    representing (SUNSET, SUNRISE) in UTC at AIRPORT for the date
+    represented by datetime.date object D. Falls back to
+    _approx_night if the location of AIRPORT is not known."""
+    if airport not in _airport_tables:
+        try:
+            lat, long = nightcalc.to_latlong(nvecs[airport])
+            observer = astral.Observer(lat, long)
+            _airport_tables[airport] = [_airport_entry(observer, X.date())
+                                        for X in _table_dates()]
+        except KeyError: #raised by nvecs if airfield not found
+            _airport_tables[airport] = None
+    table = _airport_tables[airport]
+    if table is None:
+        return _approx_night(d)
+    return table[_day_index(d)]
+
+
+def _is_night(t, sunset, sunrise):
+    if sunrise <= sunset:
+        return t > sunset or t < sunrise
+    #sunrise is before sunset in UTC when far east of Greenwich
+    return sunset < t < sunrise
+
+
+def freeform(duties: List[Duty], crews: Dict[str, List[CrewMember]],
+             airport_night: bool = False
 ) -> str:
-    output = []
+    """Create a freeform logbook text from a duty list.
+
+    :param duties: The duties to include.
+    :param crews: A mapping of crewlist_id to crew list.
+    :param airport_night: If True, sectors are marked as night using the
+        sunset and sunrise at the destination airfield rather than the
+        approximate UK values.
+
+    :return: The freeform text.
+    """
+    output = io.StringIO()
+    write_freeform(duties, crews, output, airport_night)
+    return output.getvalue()
+
+
+def write_freeform(duties: Iterable[Duty],
+                   crews: Dict[str, List[CrewMember]],
+                   f: TextIO, airport_night: bool = False
+) -> None:
+    """Write a freeform logbook text to a file-like object, a line at a time.
+
+    :param duties: The duties to include. May be a generator, in which case
+        memory use does not grow with the number of duties.
+    :param crews: A mapping of crewlist_id to crew list.
+    :param f: The text file to write to.
+    :param airport_night: As for freeform.
+    """
+    for c, line in enumerate(_lines(duties, crews, airport_night)):
+        if c: f.write("\n")
+        f.write(line)
+
+
+def _lines(duties: Iterable[Duty], crews: Dict[str, List[CrewMember]],
+           airport_night: bool
+) -> Iterator[str]:
     for duty in duties:
         if not duty.sectors: continue
-        output.append(f"{duty.start:%Y-%m-%d}")
+        yield f"{duty.start:%Y-%m-%d}"
         comment = ""
         if (len(duty.sectors) == 1 and
             (duty.sectors[0].flags & SectorFlags.QUASI)):
             comment = f" #{duty.sectors[0].name}"
-        output.append(f"{duty.start:%H%M}/{duty.finish:%H%M}{comment}")
+        yield f"{duty.start:%H%M}/{duty.finish:%H%M}{comment}"
         reg = None
         last_crew = None
         for sector in duty.sectors:
@@ -49,15 +163,18 @@ def freeform(duties: List[Duty], crews: Dict[str, List[CrewMember]]
             if sector.crewlist_id and sector.crewlist_id in crews:
                 crew = [f"{X[1]}:{X[0]}" for X in crews[sector.crewlist_id]]
                 if crew != last_crew:
-                    output.append(f"{{ {', '.join(crew)} }}")
+                    yield f"{{ {', '.join(crew)} }}"
                     last_crew = crew
 
             #night
-            sunset, sunrise = _approx_night(sector.act_finish)
+            if airport_night:
+                sunset, sunrise = _airport_night(sector.to, sector.act_finish)
+            else:
+                sunset, sunrise = _approx_night(sector.act_finish)
             mid_duty_time = (sector.act_start +
                              (sector.act_finish - sector.act_start) // 2)
             night = ""
-            if mid_duty_time.time() > sunset or mid_duty_time.time() < sunrise:
+            if _is_night(mid_duty_time.time(), sunset, sunrise):
                 night = " n"
 
             #registration and type
@@ -71,13 +188,12 @@ def freeform(duties: List[Duty], crews: Dict[str, List[CrewMember]]
                 elif (len(sector.crewlist_id) > 3 and
                     sector.crewlist_id[-3:] in ("319", "320", "321")):
                     type_ = f"A{sector.crewlist_id[-3:]}"
-                output.append(f"{sector.reg}:{type_}")
+                yield f"{sector.reg}:{type_}"
                 reg = sector.reg
 
             #sector
-            output.append(
+            yield (
                 f"{sector.from_}/{sector.to} "
                 f"{sector.act_start:%H%M}/{sector.act_finish:%H%M} "
                 f"{night}")
-        output.append("")
-    return "\n".join(output)
+        yield ""
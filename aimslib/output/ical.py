@@ -1,5 +1,6 @@
-from typing import Dict, List
+from typing import Dict, List, Iterable, TextIO
 import datetime as dt
+import io
 
 from aimslib.common.types import Duty, SectorFlags
 
@@ -22,6 +23,8 @@ SUMMARY:{route}\r
 LAST-MODIFIED:{modified}\r
 END:VEVENT"""
 
+vcalendar_head, vcalendar_tail = vcalendar.split("{}")
+
 ical_datetime = "{:%Y%m%dT%H%M%SZ}"
 
 
@@ -57,8 +60,21 @@ def _build_dict(duty: Duty) -> Dict[str, str]:
     return event
 
 def ical(duties: List[Duty]) -> str:
-    events = []
-    for duty in duties:
-        d = _build_dict(duty)
-        events.append(vevent.format(**d))
-    return vcalendar.format("\r\n".join(events))
+    output = io.StringIO(newline='')
+    write_ical(duties, output)
+    return output.getvalue()
+
+
+def write_ical(duties: Iterable[Duty], f: TextIO) -> None:
+    """Write an iCalendar file to a file-like object, an event at a time.
+
+    :param duties: The duties to include. May be a generator, in which case
+        memory use does not grow with the number of duties.
+    :param f: The text file to write to. Files should be opened with
+        newline='' so that the CRLF line endings are preserved.
+    """
+    f.write(vcalendar_head)
+    for c, duty in enumerate(duties):
+        if c: f.write("\r\n")
+        f.write(vevent.format(**_build_dict(duty)))
+    f.write(vcalendar_tail)
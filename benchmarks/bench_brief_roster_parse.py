@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+"""Compare the speed of the brief roster parser backends.
+
+Run from the repository root with:
+
+    python3 -m benchmarks.bench_brief_roster_parse
+"""
+
+import timeit
+
+import aimslib.access.brief_roster as Roster
+
+
+DAY = """\
+<div id="myday_{}"><table class="duties_table">
+<tr><td>CSBE</td><td>3:00</td></tr>
+<tr><td>&nbsp;</td><td>5:00</td></tr>
+<tr><td>B006D</td><td></td></tr>
+<tr><td>&nbsp;</td><td></td></tr>
+</table></div>
+"""
+
+
+def main():
+    for page_count in (1, 3, 12):
+        days = "".join(DAY.format(14146 + X) for X in range(28 * page_count))
+        html = ("<html><head></head><body><div id=\"main_div\">"
+                f"{days}</div></body></html>")
+        assert Roster.parse(html) == Roster.parse(html, backend="bs4")
+        results = {}
+        for backend in ("bs4", "fast"):
+            number = 20
+            t = min(timeit.repeat(
+                lambda: Roster.parse(html, backend=backend),
+                number=number, repeat=5))
+            results[backend] = t / number
+        print(f"{page_count:2d} pages: "
+              f"bs4 {results['bs4'] * 1e3:6.2f}ms  "
+              f"fast {results['fast'] * 1e3:6.2f}ms  "
+              f"speedup {results['bs4'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
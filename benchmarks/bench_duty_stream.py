@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""Compare the single pass duty_stream with the previous list based version.
+
+Run from the repository root with:
+
+    python3 -m benchmarks.bench_duty_stream
+"""
+
+import timeit
+import tracemalloc
+import datetime as dt
+from typing import Dict, List
+
+import aimslib.detailed_roster.process as p
+from aimslib.detailed_roster.process import Break, DStr, SectorFormatException
+
+
+COLUMN = ["Mon21", "l", "EJU", "6245", "05:30", "06:34", "BRS", "FNC",
+          "09:45", "(320)", "FO", "", "M", "", "6246", "10:32", "FNC", "BRS",
+          "13:59", "14:29"]
+
+
+def list_duty_stream(bstream):
+    #The implementation of duty_stream prior to the single pass version,
+    #which copies the stream and rebuilds it after each of its passes.
+    dstream = bstream[:]
+    for c in range(1, len(dstream) - 1):
+        if (isinstance(dstream[c], DStr) and
+            isinstance(dstream[c - 1], Break) and
+            isinstance(dstream[c + 1], Break)):
+            dstream[c] = None
+            dstream[c - 1] = None
+    dstream = [X for X in dstream if X]
+    for c in range(1, len(dstream) - 1):
+        if (dstream[c] == Break.COLUMN and
+            isinstance(dstream[c + 1], dt.datetime)):
+            dstream[c] = None
+    dstream = [X for X in dstream if X]
+    in_sector = False
+    for c in range(1, len(dstream) - 1):
+        if in_sector:
+            if dstream[c] == Break.LINE: raise SectorFormatException
+            if (isinstance(dstream[c], DStr) and
+                isinstance(dstream[c + 1], dt.datetime)):
+                in_sector = False
+                i = c + 2
+                while not isinstance(dstream[i], Break):
+                    if isinstance(dstream[i], DStr):
+                        dstream[i] = None
+                    i += 1
+            else:
+                dstream[c] = None
+        else:
+            if isinstance(dstream[c], DStr):
+                if isinstance(dstream[c - 1], dt.datetime):
+                    in_sector = True
+                elif isinstance(dstream[c - 1], DStr):
+                    dstream[c - 1] = None
+    dstream = [X for X in dstream if X]
+    for c in range(1, len(dstream) - 2):
+        if dstream[c] in (Break.LINE, Break.COLUMN):
+            if (not isinstance(dstream[c - 1], dt.datetime) or
+                not isinstance(dstream[c + 2], dt.datetime)):
+                raise SectorFormatException
+            tdiff = (dstream[c + 2] - dstream[c - 1]).total_seconds()
+            if tdiff >= 8 * 3600:
+                dstream[c] = Break.DUTY
+            else:
+                dstream[c] = Break.SECTOR
+    return dstream[1:-1]
+
+
+def peak_memory(func, bstream):
+    tracemalloc.start()
+    result = func(bstream)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    p.VALIDATION = "fast" #the list based version has no validation
+    funcs = (("list", list_duty_stream), ("single", p.duty_stream))
+    for days in (7, 31, 365):
+        bstream = p.basic_stream(dt.date(2019, 10, 21), [COLUMN] * days)
+        assert p.duty_stream(bstream) == list_duty_stream(bstream)
+        times: Dict[str, List[float]] = {name: [] for name, _ in funcs}
+        number = 10
+        #interleaved, so that both see the same background load
+        for _ in range(30):
+            for name, func in funcs:
+                times[name].append(
+                    timeit.timeit(lambda: func(bstream), number=number))
+        print(f"{days:3d} days: " + "  ".join(
+            f"{name} {min(times[name]) / number * 1e3:6.2f}ms "
+            f"{peak_memory(func, bstream) / 1024:6.1f}KiB"
+            for name, func in funcs))
+
+
+if __name__ == "__main__":
+    main()
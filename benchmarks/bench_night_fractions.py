@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+"""Compare serial and process pool calculation of night fractions.
+
+Run from the repository root with:
+
+    python3 -m benchmarks.bench_night_fractions
+
+The sectors are a year of daily BRS-FNC-BRS rotations.
+"""
+
+import os
+import timeit
+import datetime as dt
+
+import aimslib.output.csv as csv
+from aimslib.common.types import Sector, SectorFlags
+
+
+def _sectors(days):
+    sectors = []
+    for day in range(days):
+        start = dt.datetime(2019, 1, 1, 5, 30) + dt.timedelta(days=day)
+        for c, (from_, to) in enumerate((("BRS", "FNC"), ("FNC", "BRS"))):
+            off = start + dt.timedelta(hours=5 * c)
+            on = off + dt.timedelta(hours=4, minutes=day % 7)
+            sectors.append(Sector("6245", from_, to, off, on, off, on,
+                                  "G-EZBZ", "320", SectorFlags.NONE, "x"))
+    return sectors
+
+
+def main():
+    sectors = _sectors(365)
+    serial = min(timeit.repeat(lambda: csv.night_fractions(sectors),
+                               number=1, repeat=3))
+    print(f"{len(sectors)} sectors: serial {serial * 1e3:6.1f}ms")
+    for workers in (2, os.cpu_count() or 1):
+        t = min(timeit.repeat(
+            lambda: csv.night_fractions(sectors, max_workers=workers),
+            number=1, repeat=3))
+        print(f"{len(sectors)} sectors: {workers} workers {t * 1e3:6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+"""Compare the precomputed sunset and sunrise table with direct calculation.
+
+Run from the repository root with:
+
+    python3 -m benchmarks.bench_night_table
+"""
+
+import timeit
+import datetime as dt
+
+import aimslib.output.freeform as ff
+
+
+def main():
+    start = dt.datetime(2015, 1, 1, 18, 30)
+    dates = [start + dt.timedelta(days=X) for X in range(365 * 5)
+             if (start + dt.timedelta(days=X)).strftime("%m%d") != "0229"]
+    results = []
+    for func in (ff._calculated_night, ff._approx_night):
+        number = 20
+        t = min(timeit.repeat(lambda: [func(X) for X in dates],
+                              number=number, repeat=5))
+        results.append(t / (number * len(dates)))
+    print(f"calculated {results[0] * 1e9:6.1f}ns  "
+          f"table {results[1] * 1e9:5.1f}ns  "
+          f"speedup {results[0] / results[1]:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""Compare peak memory of string and streaming output writers.
+
+Run from the repository root with:
+
+    python3 -m benchmarks.bench_streaming_output
+
+Five years of daily two sector duties are generated lazily and written to a
+sink that discards its input, so only the memory held by the writers is
+measured.
+"""
+
+import tracemalloc
+import datetime as dt
+
+import aimslib.output.csv as csv
+import aimslib.output.ical as ical
+import aimslib.output.freeform as freeform
+from aimslib.common.types import Duty, Sector, SectorFlags, TripID
+
+
+class NullSink:
+
+    def write(self, s):
+        return len(s)
+
+
+def _duties(days):
+    for day in range(days):
+        start = dt.datetime(2015, 1, 1, 5, 30) + dt.timedelta(days=day)
+        sectors = []
+        for c, (from_, to) in enumerate((("BRS", "FNC"), ("FNC", "BRS"))):
+            off = start + dt.timedelta(hours=5 * c)
+            on = off + dt.timedelta(hours=4)
+            sectors.append(Sector("6245", from_, to, off, on, off, on,
+                                  "G-EZBZ", "320", SectorFlags.NONE, "x"))
+        yield Duty(TripID(str(day), "1"), start, sectors[-1].act_finish,
+                   sectors)
+
+
+def _peak(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    days = 365 * 5
+    cases = (
+        ("csv", lambda: csv.csv(list(_duties(days)), {}, False),
+         lambda: csv.write_csv(_duties(days), {}, False, NullSink())),
+        ("ical", lambda: ical.ical(list(_duties(days))),
+         lambda: ical.write_ical(_duties(days), NullSink())),
+        ("freeform", lambda: freeform.freeform(list(_duties(days)), {}),
+         lambda: freeform.write_freeform(_duties(days), {}, NullSink())),
+    )
+    for name, string, streaming in cases:
+        before, after = _peak(string), _peak(streaming)
+        print(f"{name}: string {before / 1024:7.0f}KiB  "
+              f"streaming {after / 1024:5.0f}KiB")
+
+
+if __name__ == "__main__":
+    main()
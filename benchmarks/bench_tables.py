@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+"""Compare the memory used by lists of Duty objects and by a DutyTable.
+
+Run from the repository root with:
+
+    python3 -m benchmarks.bench_tables
+"""
+
+import tracemalloc
+import datetime as DT
+
+from aimslib.common.tables import DutyTable
+from aimslib.common.types import Duty, Sector, SectorFlags, TripID
+
+
+ROUTES = (("BRS", "FNC"), ("FNC", "BRS"), ("BRS", "GLA"), ("GLA", "BRS"))
+
+
+def history(days):
+    #a duty of two sectors per day, built the way the parsers build them,
+    #i.e. with new objects for every field
+    duties = []
+    for day in range(days):
+        date = DT.date(2015, 1, 1) + DT.timedelta(days=day)
+        start = DT.datetime.combine(date, DT.time(5, 30))
+        sectors = []
+        for c in range(2):
+            off = start + DT.timedelta(hours=1 + 4 * c)
+            on = off + DT.timedelta(hours=3, minutes=11)
+            from_, to = ROUTES[(2 * day + c) % len(ROUTES)]
+            flight = str(6000 + (day * 2 + c) % 400)
+            sectors.append(Sector(
+                flight, "".join(from_), "".join(to), off, on,
+                off + DT.timedelta(minutes=4), on + DT.timedelta(minutes=2),
+                f"G-EZ{chr(65 + day % 26)}{chr(65 + c)}", "320",
+                SectorFlags.NONE, f"{date:%Y%m%d}{flight}~"))
+        duties.append(Duty(TripID(str(day), str(day % 1000)), start,
+                           start + DT.timedelta(hours=9), sectors))
+    return duties
+
+
+def main():
+    for days in (365, 5 * 365):
+        tracemalloc.start()
+        duties = history(days)
+        list_size = tracemalloc.get_traced_memory()[0]
+        table = DutyTable(duties)
+        assert list(table) == duties
+        del duties #the table retains only the strings it interns
+        table_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{days:4d} days: list {list_size / 1024:8.1f}KiB  "
+              f"table {table_size / 1024:7.1f}KiB  "
+              f"ratio {list_size / table_size:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""Compare table based time parsing with strptime.
+
+Run from the repository root with:
+
+    python3 -m benchmarks.bench_times
+"""
+
+import timeit
+import datetime as dt
+
+import aimslib.common.times as times
+
+
+#a mix of times and the other strings found in detailed roster columns
+ENTRIES = ["05:30", "06:34", "BRS", "FNC", "9:45", "(320)", "FO", "M",
+           "6246", "24:00", "D/O", "13:59"]
+
+
+def strptime_hm(s):
+    try:
+        return dt.datetime.strptime(s, "%H:%M").time()
+    except ValueError:
+        return None
+
+
+def strptime_hhmm(s):
+    try:
+        return dt.datetime.strptime(s, "%H%M").time()
+    except ValueError:
+        return None
+
+
+def main():
+    cases = (
+        ("%H:%M times", ["05:30", "9:45", "13:59"], strptime_hm, times.hm),
+        ("%H:%M mixed", ENTRIES, strptime_hm, times.hm),
+        ("%H%M times", ["0615", "0820", "2350"], strptime_hhmm, times.hhmm),
+    )
+    for name, entries, slow, fast in cases:
+        assert [slow(X) for X in entries] == [fast(X) for X in entries]
+        results = []
+        for func in (slow, fast):
+            number = 2000
+            t = min(timeit.repeat(lambda: [func(X) for X in entries],
+                                  number=number, repeat=5))
+            results.append(t / (number * len(entries)))
+        print(f"{name}: strptime {results[0] * 1e9:7.1f}ns  "
+              f"table {results[1] * 1e9:5.1f}ns  "
+              f"speedup {results[0] / results[1]:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+"""Compare the speed of the trip sheet parser backends.
+
+Run from the repository root with:
+
+    python3 -m benchmarks.bench_trip_parse
+"""
+
+import timeit
+
+import aimslib.access.trip as Trip
+
+
+DUTY = """\
+<tr class="mono_rows_ctrl_f3" id="14293,353365012537,14294,7585,opo,1, ,fnc,320">
+<td>7585 OPO FNC 0615 0820 Tue19Feb 2 A0620 A0818 G-UZHP 2:05 5:15 5:15 5:15 </td></tr>
+<tr class="mono_rows_ctrl_f3" id="14293,353365012537,14294,7586,fnc,1, ,opo,320">
+<td>7586 FNC OPO 0850 1050 A0855 A1049 G-UZHP 2:00 10:50 10:50 11:20 </td></tr>
+<tr class="sub_table_header_blue_courier">
+<td> 24:15 Rest OPERATIONAL HOTEL 4:05 OPO B 5:35 10:45 6:05 </td></tr>
+<tr class="sub_table_header_blue_courier">
+<td> (19/02/19 11:40) </td></tr>
+"""
+
+
+def main():
+    for duty_count in (1, 4, 16):
+        html = "<html><body><table>{}</table></body></html>".format(
+            DUTY * duty_count)
+        assert Trip.parse(html) == Trip.parse(html, backend="bs4")
+        results = {}
+        for backend in ("bs4", "fast"):
+            number = 200
+            t = min(timeit.repeat(
+                lambda: Trip.parse(html, backend=backend),
+                number=number, repeat=5))
+            results[backend] = t / number
+        print(f"{duty_count:2d} duties: "
+              f"bs4 {results['bs4'] * 1e6:7.1f}us  "
+              f"fast {results['fast'] * 1e6:7.1f}us  "
+              f"speedup {results['bs4'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
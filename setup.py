@@ -14,7 +14,9 @@ setuptools.setup(
     url="https://github.com/JonHurst/aimslib",
     packages=setuptools.find_packages(),
     package_data={"aimslib": ["py.typed"]},
-    install_requires=['Beautifulsoup4', 'requests', 'python-dateutil', 'nightflight'],
+    install_requires=['Beautifulsoup4', 'requests', 'python-dateutil', 'nightflight',
+                      'astral>=2.0,<4'],
+    extras_require={'async': ['aiohttp'], 'analytics': ['numpy']},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Programming Language :: Python :: 3",
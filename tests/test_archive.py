@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+import unittest
+import tempfile
+import os
+import types
+import time
+
+from aimslib.access.archive import Archive, rebuild_trip_cache
+from aimslib.access.cache import TripCache
+import aimslib.access.trip as Trip
+from aimslib.common.types import TripID
+
+
+TRIP_HTML = """\
+<html><body><table>
+<tr class="mono_rows_ctrl_f3" id="14262,138549409849,14262,401,brs,1, ,gla,320">
+<td>401 BRS GLA 0855 1010 A0900 A1009 OE-IVK 1:09 08:10 </td></tr>
+<tr class="mono_rows_ctrl_f3" id="14262,138549409849,14262,402,gla,1, ,brs,320">
+<td>402 GLA BRS 1035 1145 A1040 A1145 OE-IVK 1:05 11:45 </td></tr>
+</table></body></html>
+"""
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.archive = Archive(os.path.join(self.dir.name, "archive"))
+
+
+    def tearDown(self):
+        self.archive.close()
+        self.dir.cleanup()
+
+
+    def test_wrap_and_rebuild(self):
+        def post(rel_url, data):
+            return types.SimpleNamespace(text=TRIP_HTML)
+        trip_id = TripID("14262", "B089")
+        archiving_post = self.archive.wrap(post)
+        Trip.retrieve(archiving_post, trip_id)
+        Trip.retrieve(archiving_post, trip_id)
+        archiving_post("perinfo.exe/AjAction?LOGOUT=1", {"AjaxOperation": "0"})
+        entries = list(self.archive.entries())
+        self.assertEqual(len(entries), 2) #logout not archived
+        self.assertEqual(entries[0].digest, entries[1].digest)
+        self.assertEqual(entries[0].data["CROUTE"], "B089")
+        self.assertEqual(
+            self.archive.latest("perinfo.exe/schedule", entries[0].data),
+            TRIP_HTML)
+        self.assertIsNone(self.archive.latest("perinfo.exe/schedule", {}))
+        def no_post(rel_url, data):
+            raise AssertionError("Unexpected request to AIMS")
+        cache = TripCache(os.path.join(self.dir.name, "tripcache"), no_post)
+        self.assertEqual(rebuild_trip_cache(self.archive, cache), 1)
+        self.assertEqual(cache.trip(trip_id),
+                         Trip.duties(Trip.parse(TRIP_HTML), trip_id))
+
+
+    def test_wrap_under_prefetch(self):
+        def post(rel_url, data):
+            time.sleep(0.001)
+            return types.SimpleNamespace(text=TRIP_HTML)
+        trip_ids = [TripID("14262", f"B{X:03}") for X in range(40)]
+        cache = TripCache(os.path.join(self.dir.name, "tripcache"),
+                          self.archive.wrap(post))
+        cache.prefetch(trip_ids, 8)
+        entries = list(self.archive.entries())
+        self.assertEqual(sorted(X.data["CROUTE"] for X in entries),
+                         [X.trip for X in trip_ids])
+        self.assertEqual(len({X.digest for X in entries}), 1)
+        objects = os.path.join(self.archive.directory, "objects")
+        files = [X for _, _, F in os.walk(objects) for X in F]
+        self.assertEqual(files, [entries[0].digest + ".gz"])
+        self.assertEqual(self.archive.text(entries[0].digest), TRIP_HTML)
@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+import unittest
+import tempfile
+import os
+import json
+import contextlib
+import io
+
+import aimslib.detailed_roster.batch as batch
+import aimslib.detailed_roster.process as p
+
+
+COLUMN1 = ["Mon21", "l", "EJU", "6245", "05:30", "06:34", "BRS", "FNC",
+           "09:45", "(320)", "FO", "", "M", "", "6246", "10:32", "FNC", "BRS",
+           "13:59", "14:29"]
+COLUMN2 = ["Tue22", "D/O"] + [""] * (len(COLUMN1) - 2)
+
+
+def _row(*cells):
+    return "<tr>" + "".join(f"<td>{X}</td>" for X in cells) + "</tr>"
+
+
+ROSTER = ("<html><body><table>" +
+          _row("Header") +
+          _row("Personal Period:\xa021/10/2019") +
+          _row("") * 3 +
+          "".join(_row(A, B) for A, B in zip(COLUMN1, COLUMN2)) +
+          _row("Block", "") +
+          "</table></body></html>")
+
+#a crew table header followed by an empty row
+MALFORMED = ROSTER.replace(
+    "</table>", _row("DATE RTES NAMES") + "<tr></tr></table>")
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.files = {}
+        for name, content in (("a.htm", ROSTER),
+                              ("b.htm", "<html>Not a roster</html>"),
+                              ("c.htm", ROSTER)):
+            path = os.path.join(self.dir.name, name)
+            with open(path, "w") as f:
+                f.write(content)
+            self.files[name] = path
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_directory(self):
+        results = list(batch.process(self.dir.name, max_workers=2,
+                                     chunksize=1))
+        self.assertEqual([X.filename for X in results],
+                         sorted(self.files.values()))
+        expected = p.duties(ROSTER)
+        for result in (results[0], results[2]):
+            self.assertIsNone(result.error)
+            self.assertEqual(result.duties, expected)
+            self.assertEqual(result.crew, {})
+        self.assertIsNone(results[1].duties)
+        self.assertEqual(results[1].error,
+                         "InputFileException: " + str(p.InputFileException()))
+
+    def test_iterable(self):
+        missing = os.path.join(self.dir.name, "missing.htm")
+        results = list(batch.process([missing, self.files["c.htm"]],
+                                     max_workers=1))
+        self.assertTrue(results[0].error.startswith("FileNotFoundError"))
+        self.assertEqual(results[1].duties, p.duties(ROSTER))
+        self.assertEqual(list(batch.process([])), [])
+
+    def test_malformed(self):
+        malformed = os.path.join(self.dir.name, "b2.htm")
+        with open(malformed, "w") as f:
+            f.write(MALFORMED)
+        files = [self.files["a.htm"], malformed, self.files["c.htm"]]
+        results = list(batch.process(files, max_workers=1))
+        self.assertEqual([X.filename for X in results], files)
+        self.assertIsNone(results[1].duties)
+        self.assertTrue(results[1].error.startswith("IndexError"))
+        for result in (results[0], results[2]):
+            self.assertIsNone(result.error)
+            self.assertEqual(result.duties, p.duties(ROSTER))
+
+    def test_main(self):
+        outdir = os.path.join(self.dir.name, "out")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            ret = batch.main(["-o", outdir, "-j", "1", self.dir.name])
+        self.assertEqual(ret, 1)
+        self.assertIn("b.htm: InputFileException", stderr.getvalue())
+        self.assertEqual(sorted(os.listdir(outdir)), ["a.json", "c.json"])
+        with open(os.path.join(outdir, "a.json")) as f:
+            duties, crew = json.load(f)
+        self.assertEqual(len(duties), 1)
+        self.assertEqual(crew, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
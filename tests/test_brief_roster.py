@@ -4,7 +4,7 @@ import datetime
 import unittest
 from aimslib.access.brief_roster import (
     RosterEntry,
-    parse, duties,
+    parse, parse_stream, duties,
     BadBriefRoster,
     BadRosterEntry,
 )
@@ -128,6 +128,37 @@ class TestBriefRosterParsing(unittest.TestCase):
             parse(data)
 
 
+    def test_parse_backends_agree(self):
+        data = """\
+<html><head></head><body><div id="main_div">
+<div id="myday_14146"><table class="duties_table">
+<tr><td>CS<!-- comment -->BE</td><td>3:00</td></tr>
+<tr><td>&nbsp;</td><td>5:00</td></tr>
+<tr><td><div id="myday_14147"><table class="duties_table">
+<tr><td>B&amp;086</td></tr></table></div></td></tr>
+</table></div>
+<div id="myday_14150"><table class="duties_table">
+<tr><td>D/O</td><td></td></tr>
+</table></div>
+</div>
+<div id="myday_14151"><table class="duties_table">
+<tr><td>Outside main_div</td></tr>
+</table></div>
+</body></html>
+"""
+        expected = [
+            RosterEntry(aims_day='14146',
+                        items=('CS', 'BE', '3:00', '5:00', 'B&086')),
+            RosterEntry(aims_day='14147', items=('B&086',)),
+            RosterEntry(aims_day='14150', items=('D/O',))]
+        self.assertEqual(parse(data), expected)
+        self.assertEqual(parse(data, backend="bs4"), expected)
+        for chunk_size in (1, 7, 64):
+            self.assertEqual(list(parse_stream(data, chunk_size)), expected)
+        with self.assertRaises(BadBriefRoster):
+            parse("Not even HTML", backend="bs4")
+
+
 
 class TestBriefRosterProcessing(unittest.TestCase):
 
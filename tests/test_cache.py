@@ -0,0 +1,347 @@
+#!/usr/bin/python3
+
+import unittest
+from unittest import mock
+import tempfile
+import os
+import pickle
+import types
+import hashlib
+import random
+import threading
+import time
+import datetime as dt
+
+from aimslib.access.cache import (
+    SqliteStore, TripCache, CrewlistCache, FetchInfo)
+from aimslib.common.types import TripID, Duty, CrewMember
+
+
+def _no_post(rel_url, data):
+    raise AssertionError("Unexpected request to AIMS")
+
+
+class TestSqliteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, "store.sqlite")
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def test_mapping(self):
+        store = SqliteStore(self.filename, "test")
+        self.assertEqual(len(store), 0)
+        self.assertNotIn("a", store)
+        store["a"] = [1, 2]
+        store["b"] = {"x": None}
+        store["a"] = [3]
+        self.assertEqual(store["a"], [3])
+        self.assertEqual(sorted(store), ["a", "b"])
+        del store["b"]
+        with self.assertRaises(KeyError):
+            store["b"]
+        with self.assertRaises(KeyError):
+            del store["b"]
+        store.close()
+        #entries are committed as they are written
+        store = SqliteStore(self.filename, "test")
+        self.assertEqual(dict(store), {"a": [3]})
+        store.close()
+
+
+class TestSqliteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def test_import_pickle(self):
+        trip_id = TripID("14262", "B089")
+        duties = [Duty(trip_id, dt.datetime(2019, 1, 18, 6),
+                       dt.datetime(2019, 1, 18, 16, 33), [])]
+        pickle_file = os.path.join(self.dir.name, "tripcache")
+        with open(pickle_file, "wb") as f:
+            pickle.dump({trip_id: duties}, f)
+        cache = TripCache(pickle_file + ".sqlite", _no_post, "sqlite")
+        self.assertEqual(cache.import_pickle(pickle_file), 1)
+        self.assertEqual(list(cache.cache), [trip_id])
+        self.assertEqual(cache.cache[trip_id], duties)
+
+
+    def test_import_pickle_meta_and_corrupt(self):
+        trip_id = TripID("14262", "B089")
+        info = FetchInfo("abc", 1.5)
+        pickle_file = os.path.join(self.dir.name, "tripcache")
+        with open(pickle_file, "wb") as f:
+            f.write(b"garbage")
+        with open(pickle_file + ".meta", "wb") as f:
+            pickle.dump({trip_id: info}, f)
+        cache = TripCache(pickle_file + ".sqlite", _no_post, "sqlite")
+        self.assertEqual(cache.import_pickle(pickle_file), 0)
+        self.assertEqual(dict(cache.fetch_info), {trip_id: info})
+
+
+    def test_crewlist_cache(self):
+        filename = os.path.join(self.dir.name, "clcache.sqlite")
+        cache = CrewlistCache(filename, _no_post, "sqlite")
+        crew = [CrewMember("Bloggs Joe", "CP")]
+        cache.cache["14262,1,401"] = crew
+        cache.store()
+        cache = CrewlistCache(filename, _no_post, "sqlite")
+        self.assertEqual(cache.crewlist("14262,1,401"), crew)
+
+
+class TestPickleCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, "clcache")
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def test_corrupt_cache_is_empty(self):
+        cache = CrewlistCache(self.filename, _no_post)
+        cache.cache["a"] = [CrewMember("Bloggs Joe", "CP")]
+        cache.store()
+        with open(self.filename, "rb") as f:
+            data = f.read()
+        with open(self.filename, "wb") as f:
+            f.write(data[:len(data) // 2]) #simulate truncated write
+        cache = CrewlistCache(self.filename, _no_post)
+        self.assertEqual(cache.cache, {})
+        with open(self.filename, "wb") as f:
+            f.write(b"garbage")
+        cache = CrewlistCache(self.filename, _no_post)
+        self.assertEqual(cache.cache, {})
+
+
+    def test_unpickling_errors_are_empty(self):
+        with open(self.filename, "wb") as f:
+            pickle.dump({"a": []}, f)
+        for error in (MemoryError, OverflowError, RecursionError):
+            with mock.patch.object(pickle, "load", side_effect=error):
+                cache = CrewlistCache(self.filename, _no_post)
+            self.assertEqual(cache.cache, {})
+
+
+    def test_file_mode_preserved(self):
+        umask = os.umask(0o022)
+        try:
+            cache = CrewlistCache(self.filename, _no_post)
+            cache.cache["a"] = []
+            cache.store()
+            self.assertEqual(os.stat(self.filename).st_mode & 0o777, 0o644)
+            os.chmod(self.filename, 0o640)
+            cache.store()
+            self.assertEqual(os.stat(self.filename).st_mode & 0o777, 0o640)
+        finally:
+            os.umask(umask)
+
+
+    def test_overlapping_stores_merge(self):
+        cache1 = CrewlistCache(self.filename, _no_post)
+        cache2 = CrewlistCache(self.filename, _no_post)
+        cache1.cache["a"] = [CrewMember("Bloggs Joe", "CP")]
+        cache2.cache["b"] = [CrewMember("Doe Jane", "FO")]
+        cache1.store()
+        cache2.store()
+        cache = CrewlistCache(self.filename, _no_post)
+        self.assertEqual(sorted(cache.cache), ["a", "b"])
+        self.assertEqual(
+            [X for X in os.listdir(self.dir.name) if not X.endswith(".lock")],
+            ["clcache"]) #no temporary files left behind
+
+
+    def test_stale_copy_does_not_overwrite(self):
+        old = [CrewMember("Bloggs Joe", "CP")]
+        new = [CrewMember("Doe Jane", "CP")]
+        cache = CrewlistCache(self.filename, _no_post)
+        cache.cache["a"] = old
+        cache.cache["b"] = old
+        cache.store()
+        cache_a = CrewlistCache(self.filename, _no_post)
+        cache_b = CrewlistCache(self.filename, _no_post)
+        cache_b.cache["a"] = new #refreshed by b
+        del cache_b.cache["b"]
+        cache_b.store()
+        cache_a.cache["c"] = old #a only adds an entry
+        cache_a.store()
+        self.assertEqual(cache_a.cache, {"a": new, "c": old})
+        cache = CrewlistCache(self.filename, _no_post)
+        self.assertEqual(cache.cache, {"a": new, "c": old})
+        #deletions are applied too
+        del cache_a.cache["c"]
+        cache_a.store()
+        self.assertEqual(CrewlistCache(self.filename, _no_post).cache,
+                         {"a": new})
+
+
+    def test_corrupt_sqlite_is_empty(self):
+        filename = self.filename + ".sqlite"
+        with open(filename, "wb") as f:
+            f.write(b"garbage" * 1024)
+        cache = CrewlistCache(filename, _no_post, "sqlite")
+        self.assertEqual(len(cache.cache), 0)
+        self.assertTrue(os.path.exists(filename + ".corrupt"))
+
+
+class TestEviction(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, "clcache")
+        self.today = (dt.date.today() - dt.date(1980, 1, 1)).days
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def _cache(self, backend, **kwargs):
+        if backend == "sqlite":
+            return CrewlistCache(
+                self.filename + ".sqlite", _no_post, backend, **kwargs)
+        return CrewlistCache(self.filename, _no_post, backend, **kwargs)
+
+
+    def test_max_age(self):
+        for backend in ("pickle", "sqlite"):
+            cache = self._cache(backend, max_age=30)
+            crew = [CrewMember("Bloggs Joe", "CP")]
+            for days_ago in (100, 31, 30, 3):
+                cache.cache[f"{self.today - days_ago},1,401"] = crew
+            cache.store()
+            self.assertEqual(
+                sorted(self._cache(backend).cache),
+                [f"{self.today - 30},1,401", f"{self.today - 3},1,401"])
+            self.assertEqual(cache.stats().evictions, 2)
+
+
+    def test_lru(self):
+        for backend in ("pickle", "sqlite"):
+            cache = self._cache(backend, max_entries=2)
+            crew = [CrewMember("Bloggs Joe", "CP")]
+            ids = [f"{self.today - X},1,401" for X in (40, 30, 20, 10)]
+            for id_ in ids:
+                cache.cache[id_] = crew
+            cache.crewlist(ids[0]) #make oldest most recently used
+            cache.crewlist(ids[2])
+            self.assertEqual(cache.evict(), 2)
+            self.assertEqual(sorted(cache.cache), sorted([ids[0], ids[2]]))
+            self.assertEqual(tuple(cache.stats()), (2, 0, 2, 2))
+
+
+class TestTripRefresh(unittest.TestCase):
+
+    #no actual times, so always needs refresh
+    html = """\
+<html><body><table>
+<tr class="mono_rows_ctrl_f3" id="14262,138549409849,14262,401,brs,1, ,gla,320">
+<td>401 BRS GLA 0855 1010 OE-IVK 1:09 08:10 </td></tr>
+<tr class="mono_rows_ctrl_f3" id="14262,138549409849,14262,402,gla,1, ,brs,320">
+<td>402 GLA BRS 1035 1145 OE-IVK 1:05 11:45 </td></tr>
+</table></body></html>
+"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, "tripcache")
+        self.requests = []
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def _post(self, rel_url, data):
+        self.requests.append(data)
+        return types.SimpleNamespace(text=self.html)
+
+
+    def test_unchanged_page_not_reparsed(self):
+        trip_id = TripID("14262", "B089")
+        cache = TripCache(self.filename, self._post)
+        duties = cache.trip(trip_id)
+        self.assertIs(cache.trip(trip_id), duties)
+        self.assertEqual(len(self.requests), 2)
+        cache.store()
+        #fetch information persists
+        cache = TripCache(self.filename, self._post)
+        self.assertEqual(cache.fetch_info[trip_id].digest,
+                         hashlib.sha256(self.html.encode()).hexdigest())
+
+
+    def test_refresh_interval(self):
+        trip_id = TripID("14262", "B089")
+        for backend in ("pickle", "sqlite"):
+            self.requests = []
+            filename = self.filename + backend
+            cache = TripCache(filename, self._post, backend)
+            cache.trip(trip_id)
+            cache.store()
+            cache = TripCache(filename, self._post, backend,
+                              refresh_interval=3600)
+            cache.trip(trip_id)
+            self.assertEqual(len(self.requests), 1)
+            cache.refresh_interval = 0
+            cache.trip(trip_id)
+            self.assertEqual(len(self.requests), 2)
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, "clcache")
+        self.requests = []
+        self.lock = threading.Lock()
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def _post(self, rel_url, data):
+        id_ = data["LegInfo"]
+        with self.lock:
+            self.requests.append(id_)
+        time.sleep(random.random() / 100) #finish in a random order
+        if id_ == "bad":
+            raise ConnectionError(id_)
+        return types.SimpleNamespace(text=f"html for {id_}")
+
+
+    def test_prefetch(self):
+        cache = CrewlistCache(self.filename, self._post)
+        cache.cache["cached"] = []
+        ids = [str(X) for X in range(20)]
+        cache.prefetch(ids + ids[:5] + ["cached"], 4)
+        self.assertEqual(sorted(self.requests), sorted(ids))
+        self.assertEqual(cache.prefetched,
+                         {X: f"html for {X}" for X in ids})
+        #prefetched html is used once, then requested again if needed
+        self.assertEqual(cache._html("3"), "html for 3")
+        self.assertNotIn("3", cache.prefetched)
+        self.assertEqual(cache._html("3"), "html for 3")
+        self.assertEqual(self.requests.count("3"), 2)
+        #nothing new to fetch
+        self.requests = []
+        cache.prefetch(ids[5:] + ["cached"], 4)
+        self.assertEqual(self.requests, [])
+
+
+    def test_prefetch_error(self):
+        cache = CrewlistCache(self.filename, self._post)
+        with self.assertRaisesRegex(ConnectionError, "bad"):
+            cache.prefetch([str(X) for X in range(10)] + ["bad"], 4)
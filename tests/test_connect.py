@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+
+import unittest
+import base64
+import hashlib
+
+try:
+    import aiohttp
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError: #optional dependency
+    aiohttp = None
+
+import aimslib.access.connect as connect
+import aimslib.common.types as AT
+
+
+class StubServer:
+    """A minimal imitation of the AIMS login sequence.
+
+    Login requests are redirected to /aims/wtouch.exe/index, so the base url
+    of the session is /aims/.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.logged_in = False
+        self.already_logged_in = 0 #number of "please log out" replies to send
+
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/", self.root)
+        app.router.add_post("/wtouch/wtouch.exe/verify", self.verify)
+        app.router.add_get("/aims/wtouch.exe/index", self.index)
+        app.router.add_route("*", "/aims/perinfo.exe/{page}", self.page)
+        return app
+
+
+    async def root(self, request):
+        self.requests.append(("POST", "/", {}))
+        response = web.Response(text="login page")
+        response.set_cookie("session", "1")
+        return response
+
+
+    async def verify(self, request):
+        data = dict(await request.post())
+        self.requests.append(("POST", "verify", data))
+        assert request.cookies.get("session") == "1"
+        if (data.get("Crew_Id") != base64.b64encode(b"1234").decode() or
+            data.get("Crm") != hashlib.md5(b"secret").hexdigest()):
+            return web.Response(
+                text="Please re-enter your Credentials and try again")
+        if self.already_logged_in:
+            self.already_logged_in -= 1
+            raise web.HTTPFound("/aims/wtouch.exe/index?retry=1")
+        self.logged_in = True
+        raise web.HTTPFound("/aims/wtouch.exe/index")
+
+
+    async def index(self, request):
+        if "retry" in request.query:
+            return web.Response(text="Please log out and try again.")
+        return web.Response(text="Welcome")
+
+
+    async def page(self, request):
+        page = request.match_info["page"]
+        data = dict(request.query)
+        data.update(await request.post())
+        self.requests.append((request.method, page, data))
+        if page == "AjAction" and "LOGOUT" in request.query:
+            self.logged_in = False
+            return web.Response(text="logged out")
+        if page == "missing":
+            raise web.HTTPNotFound()
+        return web.Response(text=f"{page} {sorted(data.items())}")
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp not installed")
+class TestAsyncConnect(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.stub = StubServer()
+        self.server = TestServer(self.stub.app())
+        await self.server.start_server()
+        self.url = str(self.server.make_url("")).rstrip("/")
+        #the default cookie jar ignores cookies from IP address hosts
+        self.session = aiohttp.ClientSession(
+            cookie_jar=aiohttp.CookieJar(unsafe=True))
+        self.heartbeats = 0
+
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+
+    def _heartbeat(self):
+        self.heartbeats += 1
+
+
+    async def _connect(self, username="1234", pw="secret"):
+        return await connect.async_connect(
+            self.url, username, pw, self.session, self._heartbeat)
+
+
+    async def test_login_and_requests(self):
+        post = await self._connect()
+        self.assertTrue(self.stub.logged_in)
+        self.assertEqual(self.heartbeats, 1)
+        r = await post("perinfo.exe/schedule", {"Direc": 2})
+        self.assertEqual(r.text, "schedule [('Direc', '2')]")
+        self.assertEqual(r.url, self.url + "/aims/perinfo.exe/schedule")
+        r = await post("perinfo.exe/getlegmem", {"useGET": "1", "LegInfo": "x"})
+        self.assertEqual(self.stub.requests[-1],
+                         ("GET", "getlegmem", {"LegInfo": "x"}))
+        self.assertEqual(self.heartbeats, 3)
+        await connect.async_logout(post)
+        self.assertFalse(self.stub.logged_in)
+        self.assertEqual(self.stub.requests[-1],
+                         ("POST", "AjAction",
+                          {"LOGOUT": "1", "AjaxOperation": "0"}))
+
+
+    async def test_bad_credentials(self):
+        with self.assertRaises(AT.UsernamePasswordError):
+            await self._connect(pw="wrong")
+        self.assertFalse(self.stub.logged_in)
+
+
+    async def test_already_logged_in(self):
+        self.stub.already_logged_in = 1
+        post = await self._connect()
+        self.assertTrue(self.stub.logged_in)
+        pages = [X[1] for X in self.stub.requests]
+        self.assertEqual(pages, ["/", "verify", "AjAction", "/", "verify"])
+        r = await post("perinfo.exe/index", {})
+        self.assertEqual(r.text, "index []")
+
+
+    async def test_logon_error(self):
+        self.stub.already_logged_in = 2
+        with self.assertRaises(AT.LogonError):
+            await self._connect()
+
+
+    async def test_http_error(self):
+        post = await self._connect()
+        with self.assertRaises(aiohttp.ClientResponseError):
+            await post("perinfo.exe/missing", {})
+
+
+if __name__ == "__main__":
+    unittest.main()
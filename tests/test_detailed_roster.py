@@ -1197,3 +1197,130 @@ class TestCrew(unittest.TestCase):
         self.test_crew_strings = ['31/11/2019 All   FO> HUTTON STUART']
         with self.assertRaises(p.CrewFormatException):
             p.crew("", [])
+
+
+class TestDiff(unittest.TestCase):
+
+    def _sector(self, name, hour, reg=None):
+        return T.Sector(name, 'BRS', 'LPA',
+                        datetime.datetime(2017, 10, 17, hour, 0),
+                        datetime.datetime(2017, 10, 17, hour + 1, 0),
+                        datetime.datetime(2017, 10, 17, hour, 0),
+                        datetime.datetime(2017, 10, 17, hour + 1, 0),
+                        reg, None, T.SectorFlags.NONE,
+                        f"20171017{name}~")
+
+
+    def test_diff(self):
+        standby = T.Sector('ESBY', None, None,
+                           datetime.datetime(2017, 10, 18, 5, 0),
+                           datetime.datetime(2017, 10, 18, 13, 0),
+                           datetime.datetime(2017, 10, 18, 5, 0),
+                           datetime.datetime(2017, 10, 18, 13, 0),
+                           None, None,
+                           T.SectorFlags.QUASI | T.SectorFlags.GROUND_DUTY,
+                           None)
+        d1 = T.Duty(T.TripID('13804', ''),
+                    datetime.datetime(2017, 10, 17, 4, 30),
+                    datetime.datetime(2017, 10, 17, 15, 18),
+                    (self._sector('6195', 5), self._sector('6196', 11)))
+        d1_mod = d1._replace(
+            sectors=(self._sector('6195', 5), self._sector('6196', 11, 'X')))
+        d2 = T.Duty(T.TripID('13805', ''), standby.sched_start,
+                    standby.sched_finish, (standby,))
+        d3 = T.Duty(T.TripID('13806', ''),
+                    datetime.datetime(2017, 10, 19, 4, 30),
+                    datetime.datetime(2017, 10, 19, 15, 18),
+                    (self._sector('6197', 5),))
+        result = p.diff_duties([d1, d2], [d1_mod, d3])
+        self.assertEqual(result.added_duties, [d3])
+        self.assertEqual(result.removed_duties, [d2])
+        self.assertEqual(result.modified_duties, [(d1, d1_mod)])
+        self.assertEqual(result.added_sectors, [self._sector('6197', 5)])
+        self.assertEqual(result.removed_sectors, [standby])
+        self.assertEqual(result.modified_sectors,
+                         [(self._sector('6196', 11),
+                           self._sector('6196', 11, 'X'))])
+        self.assertEqual(p.diff_duties([d1, d2], [d1, d2]),
+                         p.RosterDiff([], [], [], [], [], []))
+
+
+    def test_diff_shared_trip_id(self):
+        trip_id = T.TripID('13804', '')
+        def duty(*sectors):
+            return T.Duty(trip_id, sectors[0].sched_start,
+                          sectors[-1].sched_finish, sectors)
+        d1 = duty(self._sector('6195', 5), self._sector('6196', 7))
+        d2 = duty(self._sector('6197', 15))
+        d2_mod = duty(self._sector('6197', 15, 'X'))
+        d3 = duty(self._sector('6199', 20))
+        result = p.diff_duties([d1, d2], [d1, d2_mod, d3])
+        self.assertEqual(result.added_duties, [d3])
+        self.assertEqual(result.removed_duties, [])
+        self.assertEqual(result.modified_duties, [(d2, d2_mod)])
+        self.assertEqual(result.added_sectors, [self._sector('6199', 20)])
+        result = p.diff_duties([d1, d2, d3], [d1, d2])
+        self.assertEqual(result.removed_duties, [d3])
+        self.assertEqual(result.modified_duties, [])
+
+
+class TestValidation(unittest.TestCase):
+
+    def tearDown(self):
+        p.VALIDATION = "strict"
+
+    def test_strict_reports_index(self):
+        data = [p.Break.COLUMN, datetime.datetime(2019, 4, 28, 20, 30),
+                p.Break.DUTY, p.Break.COLUMN]
+        with self.assertRaisesRegex(AssertionError, "element 2"):
+            p.duty_stream(data)
+        with self.assertRaisesRegex(AssertionError, "entry 2"):
+            p.basic_stream(datetime.date(2019, 1, 1), [["AAA", "BBB", 1]])
+
+    def test_fast_skips_checks(self):
+        data = [p.Break.COLUMN, p.Break.DUTY, p.Break.COLUMN]
+        with self.assertRaises(AssertionError):
+            p.duty_stream(data)
+        p.VALIDATION = "fast"
+        self.assertEqual(p.duty_stream(data), [p.Break.DUTY])
+
+
+class TestParsedRoster(unittest.TestCase):
+
+    COLUMN = ["Mon21", "l", "EJU", "6245", "05:30", "06:34", "BRS", "FNC",
+              "09:45", "(320)", "FO", "", "M", "", "6246", "10:32", "FNC",
+              "BRS", "13:59", "14:29"]
+    CREW = ("21/10/2019 All               "
+            "CP> SMITH JOHN          FO> JONES MARY")
+
+    def setUp(self):
+        def row(*cells):
+            return "<tr>" + "".join(f"<td>{X}</td>" for X in cells) + "</tr>"
+        self.roster = (
+            "<html><body><table>" + row("Header") +
+            row("Personal Period:\xa021/10/2019") + row("") * 3 +
+            "".join(row(X) for X in self.COLUMN) + row("Block") +
+            row("DATE RTES NAMES") + row(self.CREW) +
+            "</table></body></html>")
+        self.oldfunc = p.lines
+        self.parse_count = 0
+        def counting_lines(roster):
+            self.parse_count += 1
+            return self.oldfunc(roster)
+        p.lines = counting_lines
+
+
+    def tearDown(self):
+        p.lines = self.oldfunc
+
+
+    def test_single_parse(self):
+        parsed = p.ParsedRoster(self.roster)
+        duties, crew = parsed.duties(), parsed.crew()
+        self.assertEqual(self.parse_count, 1)
+        self.assertEqual(duties, p.duties(self.roster))
+        self.assertEqual(crew, p.crew(self.roster, duties))
+        self.assertEqual(
+            crew["201910216245~"],
+            (T.CrewMember("Smith John", "CP"),
+             T.CrewMember("Jones Mary", "FO")))
@@ -0,0 +1,360 @@
+#!/usr/bin/python3
+
+import unittest
+from unittest import mock
+import contextlib
+import os
+import re
+import pickle
+import tempfile
+import threading
+import random
+import time
+import types
+import datetime as dt
+
+import aimslib.access.expanded_roster as ER
+from aimslib.common.types import TripID, Duty, CrewMember
+
+
+TRIP_HTML = """\
+<html><body><table>
+<tr class="mono_rows_ctrl_f3" id="{0},1,{0},401,brs,1, ,gla,320">
+<td>401 BRS GLA 0855 1010 A0900 A1009 OE-IVK 1:09 08:10 </td></tr>
+<tr class="mono_rows_ctrl_f3" id="{0},1,{0},402,gla,1, ,brs,320">
+<td>402 GLA BRS 1035 1145 A1040 A1145 OE-IVK 1:05 11:45 </td></tr>
+</table></body></html>
+"""
+
+CREW_HTML = """\
+<html><body><table>
+<tr class="sub_table_header"><td>header</td></tr>
+<tr><td>1</td><td>{0}</td><td></td><td></td><td></td><td>CP</td>
+<td></td><td></td><td></td></tr>
+</table></body></html>
+"""
+
+
+def _sparse(aims_day, trip):
+    #a brief roster entry for a trip, before expansion from its trip sheet
+    return Duty(TripID(str(aims_day), trip), None, None, None)
+
+
+class StubAIMS:
+    """Stands in for the post function returned by connect.connect.
+
+    :param pages: The sparse duties of each brief roster page, in the order
+        they are retrieved.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+        self.times = []
+        self.fail = set()
+        self.missing = set() #trips without details
+        self.multi = set() #trips of two duties
+        self.pending = set() #trips without actual times
+        self.notification = ""
+        self.retrieved = 0
+        self.lock = threading.Lock()
+
+
+    def post(self, rel_url, data):
+        with self.lock:
+            self.requests.append(dict(data))
+            self.times.append(time.monotonic())
+        time.sleep(random.random() / 200) #finish in a random order
+        if rel_url == "perinfo.exe/index":
+            text = f'\r\nvar notification = Trim("{self.notification}");\r\n'
+        elif "ORGDAY" in data:
+            if data["CROUTE"] in self.fail:
+                raise ConnectionError(data["CROUTE"])
+            if data["CROUTE"] in self.missing:
+                text = "Unable to find the trip details"
+            else:
+                text = TRIP_HTML.format(data["ORGDAY"])
+            if data["CROUTE"] in self.multi:
+                text = text.replace(
+                    "<tr class=\"mono_rows_ctrl_f3\" id=\"{0},1,{0},402".format(
+                        data["ORGDAY"]),
+                    "<tr><td>Rest</td></tr>\n"
+                    "<tr class=\"mono_rows_ctrl_f3\" id=\"{0},1,{0},402".format(
+                        data["ORGDAY"]))
+            if data["CROUTE"] in self.pending:
+                text = re.sub(r" A\d{4}", "", text)
+        elif "LegInfo" in data:
+            text = CREW_HTML.format(data["LegInfo"].upper())
+        else:
+            raise AssertionError(f"Unexpected request: {rel_url} {data}")
+        return types.SimpleNamespace(text=text)
+
+
+    def retrieve(self, post, count):
+        self.retrieved += 1
+        yield from self.pages
+
+
+    def patches(self, directory):
+        """Patch brief roster access to return the pages."""
+        return (
+            mock.patch.object(ER, "CACHE_DIR", directory + "/"),
+            mock.patch.object(ER.Roster, "retrieve", self.retrieve),
+            mock.patch.object(ER.Roster, "parse", lambda page: page),
+            mock.patch.object(ER.Roster, "duties", lambda page: list(page)),
+        )
+
+
+class TestExpandedRoster(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    @contextlib.contextmanager
+    def _patched(self, stub, cache_dir=None):
+        with contextlib.ExitStack() as stack:
+            for patch in stub.patches(cache_dir or self.dir.name):
+                stack.enter_context(patch)
+            yield
+
+
+    def _run(self, stub, func, *args, cache_dir=None, **kwargs):
+        with self._patched(stub, cache_dir):
+            return func(stub.post, *args, **kwargs)
+
+
+    def _pages(self):
+        trips = [_sparse(14262 + X, f"T{X:02}") for X in range(12)]
+        standby = Duty(TripID("14290", ""), dt.datetime(2019, 2, 15, 6),
+                       dt.datetime(2019, 2, 15, 14), [])
+        return [list(reversed(trips[:6])) + [standby], trips[6:]]
+
+
+    def test_duties_parallel_matches_serial(self):
+        serial = self._run(StubAIMS(self._pages()), ER.duties, 2,
+                           cache_dir=tempfile.mkdtemp(dir=self.dir.name))
+        stub = StubAIMS(self._pages())
+        parallel = self._run(stub, ER.duties, 2, max_workers=4)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(parallel, sorted(parallel))
+        self.assertEqual(len(parallel), 13)
+        self.assertEqual(len(stub.requests), 12) #one per trip
+
+
+    def test_duties_worker_error(self):
+        stub = StubAIMS(self._pages())
+        stub.fail.add("T07")
+        with self.assertRaisesRegex(ConnectionError, "T07"):
+            self._run(stub, ER.duties, 2, max_workers=4)
+
+
+    def test_crew(self):
+        stub = StubAIMS(self._pages())
+        dutylist = self._run(stub, ER.duties, 2)
+        stub.requests = []
+        crew = self._run(stub, ER.crew, dutylist, max_workers=4)
+        ids = [S.crewlist_id for D in dutylist if D.sectors
+               for S in D.sectors]
+        self.assertEqual(sorted(crew), sorted(ids))
+        for id_ in ids:
+            self.assertEqual(crew[id_], [CrewMember(id_.title(), "CP")])
+        self.assertEqual(len(stub.requests), len(ids))
+
+
+    def test_crew_rate_limited(self):
+        stub = StubAIMS(self._pages())
+        dutylist = self._run(stub, ER.duties, 2)[:4]
+        stub.times = []
+        rate = 50.0
+        self._run(stub, ER.crew, dutylist, max_workers=4, rate=rate)
+        self.assertEqual(len(stub.times), 8)
+        #requests are spread out despite four workers
+        elapsed = max(stub.times) - min(stub.times)
+        self.assertGreaterEqual(elapsed, 7 / rate * 0.9)
+
+
+    def test_crew_worker_error(self):
+        stub = StubAIMS(self._pages())
+        dutylist = self._run(stub, ER.duties, 2)
+        def post(rel_url, data):
+            if data["LegInfo"].startswith("14265"):
+                raise ConnectionError(data["LegInfo"])
+            return stub.post(rel_url, data)
+        with self.assertRaisesRegex(ConnectionError, "14265"):
+            with mock.patch.object(ER, "CACHE_DIR", self.dir.name + "/"):
+                ER.crew(post, dutylist, max_workers=4)
+
+
+    def test_iter_duties_deduplicates(self):
+        trips = [_sparse(14262 + X, f"T{X:02}") for X in range(5)]
+        #T01 spans three pages, T02 turns up again two pages later
+        pages = [trips[0:2], trips[1:3], trips[1:2] + trips[3:4],
+                 trips[2:3] + trips[4:5]]
+        stub = StubAIMS(pages)
+        with self._patched(stub):
+            duties = list(ER.iter_duties(stub.post, 4))
+        self.assertEqual([X.trip_id.trip for X in duties],
+                         ["T00", "T01", "T02", "T03", "T04"])
+        self.assertEqual(len(stub.requests), 5)
+        self.assertEqual(duties, self._run(stub, ER.duties, 4))
+
+
+    def test_iter_duties_close_stores_cache(self):
+        stub = StubAIMS([[_sparse(14262, "T00")], [_sparse(14263, "T01")]])
+        with self._patched(stub):
+            gen = ER.iter_duties(stub.post, 2)
+            self.assertEqual(next(gen).trip_id.trip, "T00")
+            gen.close()
+        cache = ER.TripCache(self.dir.name + "/aimslib.tripcache", stub.post)
+        self.assertEqual(list(cache.cache), [TripID("14262", "T00")])
+
+
+    def test_sqlite_migration(self):
+        trip_id = TripID("14262", "T00")
+        duties = [Duty(trip_id, dt.datetime(2019, 1, 18, 6),
+                       dt.datetime(2019, 1, 18, 16, 33), [])]
+        pickle_file = os.path.join(self.dir.name, "aimslib.tripcache")
+        with open(pickle_file, "wb") as f:
+            pickle.dump({trip_id: duties}, f)
+        with mock.patch.object(ER, "CACHE_DIR", self.dir.name + "/"), \
+             mock.patch.object(ER, "CACHE_BACKEND", "sqlite"):
+            #an interrupted import leaves no database behind...
+            with mock.patch.object(ER.TripCache, "import_pickle",
+                                   side_effect=KeyboardInterrupt):
+                with self.assertRaises(KeyboardInterrupt):
+                    ER._cache(ER.TripCache, "aimslib.tripcache", None)
+            self.assertFalse(os.path.exists(pickle_file + ".sqlite"))
+            #...so the import is tried again next time
+            cache = ER._cache(ER.TripCache, "aimslib.tripcache", None)
+            self.assertEqual(cache.cache[trip_id], duties)
+            cache.close()
+            self.assertEqual(sorted(os.listdir(self.dir.name)),
+                             ["aimslib.tripcache", "aimslib.tripcache.lock",
+                              "aimslib.tripcache.sqlite"])
+
+
+    def test_sqlite_migration_concurrent(self):
+        trip_id = TripID("14262", "T00")
+        duties = [Duty(trip_id, dt.datetime(2019, 1, 18, 6),
+                       dt.datetime(2019, 1, 18, 16, 33), [])]
+        with open(os.path.join(self.dir.name, "aimslib.tripcache"), "wb") as f:
+            pickle.dump({trip_id: duties}, f)
+        import_pickle = ER.TripCache.import_pickle
+        imports = []
+        def slow_import(cache, filename):
+            imports.append(filename)
+            time.sleep(0.1) #so that the other thread arrives mid import
+            return import_pickle(cache, filename)
+        results = []
+        def migrate():
+            cache = ER._cache(ER.TripCache, "aimslib.tripcache", None)
+            results.append(cache.cache[trip_id])
+            cache.close()
+        with mock.patch.object(ER, "CACHE_DIR", self.dir.name + "/"), \
+             mock.patch.object(ER, "CACHE_BACKEND", "sqlite"), \
+             mock.patch.object(ER.TripCache, "import_pickle", slow_import):
+            threads = [threading.Thread(target=migrate) for _ in range(2)]
+            for t in threads: t.start()
+            for t in threads: t.join()
+        self.assertEqual(len(imports), 1)
+        self.assertEqual(results, [duties, duties])
+        self.assertFalse([X for X in os.listdir(self.dir.name)
+                          if X.endswith((".tmp", "-journal"))])
+
+
+    def test_sync_snapshot_hit(self):
+        stub = StubAIMS(self._pages())
+        full = self._run(stub, ER.sync, "1234", 2)
+        self.assertEqual(full, self._run(StubAIMS(self._pages()), ER.duties, 2,
+                                         cache_dir=tempfile.mkdtemp(
+                                             dir=self.dir.name)))
+        self.assertEqual(stub.retrieved, 1)
+        stub.requests = []
+        self.assertEqual(self._run(stub, ER.sync, "1234", 2), full)
+        self.assertEqual(stub.retrieved, 1)
+        self.assertEqual(stub.requests, [{"useGet": "1"}]) #changes check
+        self.assertTrue(os.path.exists(
+            os.path.join(self.dir.name, "aimslib.1234.snapshot")))
+
+
+    def test_sync_snapshot_per_user(self):
+        stub_a = StubAIMS(self._pages())
+        stub_b = StubAIMS([[_sparse(14300, "B00")]])
+        duties_a = self._run(stub_a, ER.sync, "1234", 2)
+        duties_b = self._run(stub_b, ER.sync, "5678", 2)
+        self.assertEqual(stub_b.retrieved, 1)
+        self.assertEqual([X.trip_id.trip for X in duties_b], ["B00"])
+        #each user gets their own snapshot back
+        self.assertEqual(self._run(stub_a, ER.sync, "1234", 2), duties_a)
+        self.assertEqual(self._run(stub_b, ER.sync, "5678", 2), duties_b)
+        self.assertEqual((stub_a.retrieved, stub_b.retrieved), (1, 1))
+        #a crew id that is not a safe file name
+        self._run(stub_b, ER.sync, "../x", 2)
+        self.assertIn("aimslib...%2Fx.snapshot", os.listdir(self.dir.name))
+
+
+    def test_sync_snapshot_invalidated(self):
+        stub = StubAIMS(self._pages())
+        self._run(stub, ER.sync, "1234", 2)
+        self._run(stub, ER.sync, "1234", 3) #different months
+        self.assertEqual(stub.retrieved, 2)
+        stub.notification = "Roster changed"
+        self._run(stub, ER.sync, "1234", 3)
+        self.assertEqual(stub.retrieved, 3)
+        stub.notification = ""
+        self._run(stub, ER.sync, "1234", 3)
+        self.assertEqual(stub.retrieved, 3) #snapshot of changed roster used
+        snapshot_file = os.path.join(self.dir.name, "aimslib.1234.snapshot")
+        with open(snapshot_file, "rb") as f:
+            snapshot = pickle.load(f)
+        snapshot["date"] -= dt.timedelta(days=1)
+        with open(snapshot_file, "wb") as f:
+            pickle.dump(snapshot, f)
+        self._run(stub, ER.sync, "1234", 3)
+        self.assertEqual(stub.retrieved, 4)
+
+
+    def test_sync_snapshot_refresh(self):
+        stub = StubAIMS(self._pages())
+        stub.pending.update(["T00", "T01"])
+        full = self._run(stub, ER.sync, "1234", 2)
+        stub.requests = []
+        stub.pending.clear()
+        stub.missing.add("T01")
+        with mock.patch("sys.stderr"):
+            dutylist = self._run(stub, ER.sync, "1234", 2)
+        self.assertEqual(stub.retrieved, 1)
+        #T00 refreshed with actual times, T01 has gone from AIMS
+        self.assertEqual(sorted(X["CROUTE"] for X in stub.requests
+                                if "CROUTE" in X), ["T00", "T01"])
+        self.assertEqual([X.trip_id.trip for X in dutylist],
+                         [X.trip_id.trip for X in full if X.trip_id.trip != "T01"])
+        t00 = [X for X in dutylist if X.trip_id.trip == "T00"][0]
+        self.assertIsNotNone(t00.sectors[0].act_start)
+
+
+    def test_sync_snapshot_evicted_trip(self):
+        stub = StubAIMS([[_sparse(14262, "T00"), _sparse(14300, "T01")]])
+        stub.multi.add("T00")
+        with mock.patch.object(ER, "CACHE_MAX_AGE", 30):
+            full = self._run(stub, ER.sync, "1234", 2)
+            self.assertEqual([X.trip_id.trip for X in full],
+                             ["T00", "T00", "T01"])
+            #the trips are old enough to be evicted when the cache is stored
+            cache = ER.TripCache(self.dir.name + "/aimslib.tripcache",
+                                 stub.post)
+            self.assertEqual(dict(cache.cache), {})
+            stub.requests = []
+            self.assertEqual(self._run(stub, ER.sync, "1234", 2), full)
+        self.assertEqual(stub.retrieved, 1)
+        self.assertEqual(sorted(X["CROUTE"] for X in stub.requests
+                                if "CROUTE" in X), ["T00", "T01"])
+
+
+if __name__ == "__main__":
+    unittest.main()
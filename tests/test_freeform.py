@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+
+import unittest
+import io
+import datetime as dt
+
+import aimslib.output.freeform as ff
+from aimslib.common.types import Duty, Sector, SectorFlags, TripID
+
+
+def _sector(from_, to, start, finish):
+    return Sector("6245", from_, to, start, finish, start, finish,
+                  "G-EZBZ", "320", SectorFlags.NONE, "x")
+
+
+class TestNightTable(unittest.TestCase):
+
+    def test_matches_calculation(self):
+        start = dt.datetime(2019, 1, 1, 12, 30)
+        for c in range(365 * 4 + 1):
+            d = start + dt.timedelta(days=c)
+            if (d.month, d.day) == (2, 29): continue
+            self.assertEqual(ff._approx_night(d), ff._calculated_night(d), d)
+
+    def test_leap_day(self):
+        self.assertEqual(ff._approx_night(dt.datetime(2020, 2, 29)),
+                         ff._calculated_night(dt.datetime(2019, 2, 28)))
+        self.assertEqual(len(ff._NIGHT_TABLE), 366)
+
+    def test_airport_night(self):
+        sunset, sunrise = ff._airport_night("BRS", dt.datetime(2019, 12, 21))
+        self.assertEqual((sunset.hour, sunrise.hour), (16, 8))
+        self.assertEqual(ff._airport_night("XXX", dt.datetime(2019, 6, 1)),
+                         ff._approx_night(dt.datetime(2019, 6, 1)))
+
+    def test_is_night(self):
+        sunset, sunrise = dt.time(18), dt.time(6)
+        self.assertTrue(ff._is_night(dt.time(19), sunset, sunrise))
+        self.assertFalse(ff._is_night(dt.time(12), sunset, sunrise))
+        #far east of Greenwich, sunset precedes sunrise in UTC
+        sunset, sunrise = dt.time(7), dt.time(21)
+        self.assertTrue(ff._is_night(dt.time(12), sunset, sunrise))
+        self.assertFalse(ff._is_night(dt.time(3), sunset, sunrise))
+
+    def test_freeform(self):
+        #a late December evening flight arriving in Madeira
+        off = dt.datetime(2019, 12, 21, 14, 0)
+        sector = _sector("BRS", "FNC", off, off + dt.timedelta(hours=4))
+        duties = [Duty(TripID("1", "1"), off, sector.act_finish, [sector])]
+        self.assertIn("BRS/FNC 1400/1800  n", ff.freeform(duties, {}))
+        self.assertIn("BRS/FNC 1400/1800 \n",
+                      ff.freeform(duties, {}, airport_night=True))
+
+    def test_write_freeform(self):
+        off = dt.datetime(2019, 12, 21, 14, 0)
+        duties = [Duty(TripID(str(X), "1"), off, off, [_sector(
+            "BRS", "FNC", off + dt.timedelta(days=X),
+            off + dt.timedelta(days=X, hours=4))]) for X in range(3)]
+        f = io.StringIO()
+        ff.write_freeform((X for X in duties), {}, f)
+        expected = "\n".join(
+            ["2019-12-21\n1400/1400\nG-EZBZ:320\nBRS/FNC 1400/1800  n\n"] * 3)
+        self.assertEqual(f.getvalue(), expected)
+        self.assertEqual(ff.freeform(duties, {}), expected)
+        f = io.StringIO()
+        ff.write_freeform(iter(()), {}, f)
+        self.assertEqual(f.getvalue(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
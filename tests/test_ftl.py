@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+import unittest
+import random
+import datetime as DT
+
+import aimslib.analytics.ftl as ftl
+import aimslib.analytics.rolling as rolling
+from aimslib.common.types import Duty, Sector, SectorFlags, TripID
+
+
+def _overlap(start, end, period_start, period_end):
+    latest_start, earliest_end = max(start, period_start), min(end, period_end)
+    return max((earliest_end - latest_start).total_seconds() // 60, 0)
+
+
+def _period_start(day, limit):
+    if limit.period == ftl.Period.DAYS:
+        return day - DT.timedelta(days=limit.length - 1)
+    if limit.period == ftl.Period.CALENDAR_YEAR:
+        return day.replace(month=1, day=1)
+    month = day.year * 12 + day.month - 1 - (limit.length - 1)
+    return DT.date(month // 12, month % 12 + 1, 1)
+
+
+class TestFTL(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(7)
+        self.duties = []
+        start = DT.datetime(2018, 12, 20, 22, 0)
+        for c in range(300):
+            finish = start + DT.timedelta(hours=random.randint(6, 13))
+            off = start + DT.timedelta(minutes=45)
+            on = off + DT.timedelta(minutes=random.randint(60, 300))
+            sector = Sector("6000", "BRS", "FNC", off, on, off, on,
+                            "G-EZAA", "320", SectorFlags.NONE, None)
+            self.duties.append(
+                Duty(TripID(str(c), ""), start, finish, [sector]))
+            start = finish + DT.timedelta(hours=random.randint(10, 40))
+
+    def test_against_naive(self):
+        first, last = DT.date(2019, 1, 1), DT.date(2019, 4, 30)
+        limits = ftl.DEFAULT_LIMITS + (
+            ftl.Limit("2 months", "duty", 150, 2, ftl.Period.CALENDAR_MONTHS),)
+        reports = ftl.evaluate(self.duties, limits, first, last)
+        self.assertEqual([X.limit for X in reports], list(limits))
+        for report in reports:
+            limit = report.limit
+            for k, day in enumerate(report.days.tolist()):
+                period_start = DT.datetime.combine(
+                    _period_start(day, limit), DT.time())
+                period_end = DT.datetime.combine(
+                    day + DT.timedelta(days=1), DT.time())
+                if limit.quantity == "duty":
+                    times = [(X.start, X.finish) for X in self.duties]
+                else:
+                    times = [rolling._sector_times(X.sectors[0])
+                             for X in self.duties]
+                total = sum(_overlap(S, E, period_start, period_end)
+                            for S, E in times)
+                self.assertEqual(report.totals[k], total, (limit, day))
+                self.assertEqual(report.headroom[k],
+                                 limit.hours * 60 - total)
+            self.assertEqual(
+                report.breaches,
+                [D for D, H in zip(report.days.tolist(), report.headroom)
+                 if H < 0])
+
+    def test_breach(self):
+        start = DT.datetime(2019, 3, 1, 6, 0)
+        duties = [Duty(TripID(str(X), ""),
+                       start + DT.timedelta(days=X),
+                       start + DT.timedelta(days=X, hours=13), None)
+                  for X in range(5)]
+        report = ftl.evaluate(duties, [ftl.DEFAULT_LIMITS[0]])[0]
+        #13 hours a day for 5 days breaches 60 hours on the 5th day
+        self.assertEqual(report.breaches, [DT.date(2019, 3, 5)])
+        self.assertEqual(report.headroom.tolist(),
+                         [2820, 2040, 1260, 480, -300])
+
+    def test_bad_limit(self):
+        with self.assertRaises(ValueError):
+            ftl.evaluate(self.duties, [ftl.Limit("x", "sectors", 10, 7)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+
+import unittest
+
+from aimslib.common.htmlparse import StackParser
+
+
+class Recorder(StackParser):
+
+    def __init__(self):
+        StackParser.__init__(self)
+        self.events = []
+
+
+    def start_element(self, tag, attrs):
+        parent = self.stack[-1][0] if self.stack else None
+        self.events.append(("start", tag, parent))
+        return tag.upper()
+
+
+    def end_elements(self, values, depth):
+        self.events.append(("end", values, depth))
+
+
+class TestStackParser(unittest.TestCase):
+
+    def _events(self, html):
+        parser = Recorder()
+        parser.feed(html)
+        parser.close()
+        return parser.events, parser.stack
+
+    def test_nesting(self):
+        events, stack = self._events("<div><p>a<br>b</p></div>")
+        self.assertEqual(events, [
+            ("start", "div", None), ("start", "p", "div"),
+            ("end", ["P"], 1), ("end", ["DIV"], 0)])
+        self.assertEqual(stack, [])
+
+    def test_unclosed_elements(self):
+        #closing the table also closes the unterminated tr and td
+        events, _ = self._events("<table><tr><td>x</table>")
+        self.assertEqual(events[-1], ("end", ["TABLE", "TR", "TD"], 0))
+
+    def test_stray_end_tag(self):
+        events, stack = self._events("<div></span><img></div>")
+        self.assertEqual(events, [("start", "div", None),
+                                  ("end", ["DIV"], 0)])
+        self.assertEqual(stack, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+
+import unittest
+import io
+from unittest import mock
+import datetime as dt
+
+import aimslib.output.ical as ical
+from aimslib.common.types import Duty, Sector, SectorFlags, TripID
+
+
+def _duty(day):
+    off = dt.datetime(2019, 10, 21 + day, 5, 30)
+    on = off + dt.timedelta(hours=3)
+    sector = Sector("6245", "BRS", "FNC", off, on, None, None,
+                    "G-EZBZ", "320", SectorFlags.NONE, "x")
+    return Duty(TripID(str(day), "1"), off - dt.timedelta(hours=1), on,
+                [sector])
+
+
+MODIFIED = dt.datetime(2020, 1, 1, 12, 0)
+EXPECTED_ICAL = """\
+BEGIN:VCALENDAR\r
+VERSION:2.0\r
+PRODID:hursts.org.uk\r
+BEGIN:VEVENT\r
+UID:2019-10-21T04:30:00BRSFNC@HURSTS.ORG.UK\r
+DTSTAMP:20200101T120000Z\r
+DTSTART:20191021T043000Z\r
+DTEND:20191021T083000Z\r
+SUMMARY:BRS-FNC\r
+DESCRIPTION:05:30z-08:30z 6245 BRS/FNC G-EZBZ\r
+LAST-MODIFIED:20200101T120000Z\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:2019-10-22T04:30:00BRSFNC@HURSTS.ORG.UK\r
+DTSTAMP:20200101T120000Z\r
+DTSTART:20191022T043000Z\r
+DTEND:20191022T083000Z\r
+SUMMARY:BRS-FNC\r
+DESCRIPTION:05:30z-08:30z 6245 BRS/FNC G-EZBZ\r
+LAST-MODIFIED:20200101T120000Z\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:2019-10-23T04:30:00BRSFNC@HURSTS.ORG.UK\r
+DTSTAMP:20200101T120000Z\r
+DTSTART:20191023T043000Z\r
+DTEND:20191023T083000Z\r
+SUMMARY:BRS-FNC\r
+DESCRIPTION:05:30z-08:30z 6245 BRS/FNC G-EZBZ\r
+LAST-MODIFIED:20200101T120000Z\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+class TestIcal(unittest.TestCase):
+
+    def test_write_ical(self):
+        duties = [_duty(X) for X in range(3)]
+        with mock.patch.object(ical, "dt") as m:
+            m.datetime.utcnow.return_value = MODIFIED
+            f = io.StringIO(newline='')
+            ical.write_ical((X for X in duties), f)
+            self.assertEqual(f.getvalue(), EXPECTED_ICAL)
+            self.assertEqual(ical.ical(duties), EXPECTED_ICAL)
+
+    def test_empty(self):
+        f = io.StringIO(newline='')
+        ical.write_ical([], f)
+        self.assertEqual(f.getvalue(), ical.vcalendar.format(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+import unittest
+import io
+import datetime as dt
+
+import aimslib.output.csv as csv
+from aimslib.common.types import (
+    Duty, Sector, SectorFlags, TripID, CrewMember)
+
+
+def _sector(from_, to, start, finish, flags=SectorFlags.NONE):
+    return Sector("6245", from_, to, start, finish, start, finish,
+                  "G-EZBZ", "320", flags, "crewlist")
+
+
+START = dt.datetime(2019, 10, 21, 17, 30)
+FINISH = dt.datetime(2019, 10, 21, 21, 34)
+SECTORS = [
+    _sector("BRS", "FNC", START, FINISH),
+    _sector("FNC", "BRS", FINISH + dt.timedelta(hours=1),
+            FINISH + dt.timedelta(hours=5)),
+    _sector("BRS", "XXX", START, FINISH),
+    _sector("BRS", "FNC", START, FINISH, SectorFlags.POSITIONING),
+]
+DUTIES = [
+    Duty(TripID("1", "1"), START, FINISH, SECTORS[:2]),
+    Duty(TripID("2", "2"), START, FINISH, SECTORS[2:]),
+    Duty(TripID("3", "3"), START, FINISH, SECTORS[:1]),
+]
+CREWS = {"crewlist": [CrewMember("Bloggs Joe", "CP")]}
+EXPECTED_CSV = (
+    '"Off Blocks","On Blocks","Origin","Destination","Registration",'
+    '"Type","Captain","Role","Crew","Night"\n'
+    '"2019-10-21 17:30:00","2019-10-21 21:34:00","BRS","FNC","G-EZBZ",'
+    '"320","Self","p1","CP:Bloggs Joe","0.957"\n'
+    '"2019-10-21 22:34:00","2019-10-22 02:34:00","FNC","BRS","G-EZBZ",'
+    '"320","Self","p1","CP:Bloggs Joe","1.0"\n'
+    '"2019-10-21 17:30:00","2019-10-21 21:34:00","BRS","XXX","G-EZBZ",'
+    '"320","Self","p1","CP:Bloggs Joe",""\n'
+    '"2019-10-21 17:30:00","2019-10-21 21:34:00","BRS","FNC","G-EZBZ",'
+    '"320","Self","p1","CP:Bloggs Joe","0.957"\n')
+
+
+class TestCSV(unittest.TestCase):
+
+    def test_night_fraction(self):
+        night = csv.night_fraction(SECTORS[0])
+        self.assertTrue(0 < night < 1)
+        self.assertIsNone(csv.night_fraction(SECTORS[2]))
+
+    def test_night_fractions(self):
+        expected = [csv.night_fraction(X) for X in SECTORS[:3]]
+        sectors = SECTORS[:3] + SECTORS[:1]
+        self.assertEqual(csv.night_fractions(sectors),
+                         expected + expected[:1])
+        self.assertEqual(csv.night_fractions(sectors, max_workers=2),
+                         expected + expected[:1])
+        self.assertEqual(csv.night_fractions([]), [])
+
+    def test_batched_output_identical(self):
+        serial = csv.csv(DUTIES, CREWS, True)
+        self.assertEqual(csv.csv(DUTIES, CREWS, True, max_workers=2), serial)
+        lines = serial.splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[1].endswith(
+            f'"CP:Bloggs Joe","{csv.night_fraction(SECTORS[0])}"'))
+        self.assertTrue(lines[3].endswith('"CP:Bloggs Joe",""'))
+
+    def test_write_csv(self):
+        f = io.StringIO(newline='')
+        csv.write_csv((X for X in DUTIES), CREWS, False, f)
+        self.assertEqual(f.getvalue(), EXPECTED_CSV)
+        self.assertEqual(csv.csv(DUTIES, CREWS, False), EXPECTED_CSV)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+
+import unittest
+from unittest import mock
+import threading
+import time
+import requests
+import requests.adapters
+
+import aimslib.access.pool as P
+
+
+LOGIN_FORM = '<form><input name="Crew_Id"><input name="Crm"></form>'
+
+
+class StubAdapter(requests.adapters.HTTPAdapter):
+    """A transport that imitates the AIMS login sequence without a network.
+
+    Requests to the login url are answered from "aims.example"; everything
+    else is expected on "app.example", to which the login redirects.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.logins = []
+        self.expire = set() #usernames whose sessions have expired
+        self.lock = threading.Lock()
+
+
+    def send(self, request, **kwargs):
+        url = request.url
+        with self.lock:
+            self.requests.append((request.method, url))
+        text = ""
+        if url.endswith("/wtouch/wtouch.exe/verify"):
+            body = dict(X.split("=") for X in request.body.split("&"))
+            username = requests.utils.unquote(body["Crew_Id"])
+            with self.lock:
+                self.logins.append(username)
+                self.expire.discard(username)
+            url = "https://app.example/aims/wtouch.exe/index"
+        elif "LOGOUT" in url:
+            text = "logged out"
+        elif url.startswith("https://app.example/aims/"):
+            user = requests.utils.unquote(request.headers.get("X-User", ""))
+            text = LOGIN_FORM if user in self.expire else "page"
+        else:
+            text = "login page"
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.request = request
+        response.encoding = "utf-8"
+        response._content = text.encode()
+        return response
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = P.SessionPool("https://aims.example", idle_timeout=60)
+        self.adapter = StubAdapter()
+        self.pool.adapter = self.adapter
+
+
+    def tearDown(self):
+        self.pool.close()
+
+
+    def _connect(self, username):
+        post = self.pool.connect(username, "pw")
+        #tag requests so that the stub can tell the users apart
+        self.pool.sessions[username].session.headers["X-User"] = (
+            P._encode_credentials(username, "")[0])
+        return post
+
+
+    def test_connections_per_host(self):
+        pool = P.SessionPool("https://aims.example")
+        self.assertGreater(pool.adapter._pool_connections, 1)
+        pool.adapter.close()
+
+
+    def test_checkout_and_return(self):
+        post_a = self._connect("a")
+        post_b = self._connect("b")
+        for _ in range(3):
+            self.assertEqual(post_a("perinfo.exe/index", {}).text, "page")
+            self.assertEqual(post_b("perinfo.exe/index", {}).text, "page")
+        self.assertEqual(len(self.adapter.logins), 2) #one login per user
+        self.assertIsNot(self.pool.sessions["a"].session,
+                         self.pool.sessions["b"].session)
+        #all requests went through the shared adapter
+        self.assertEqual(len(self.adapter.requests), 2 * 2 + 6)
+        self.pool.disconnect("a")
+        self.assertNotIn("a", self.pool.sessions)
+        self.assertIn("LOGOUT", self.adapter.requests[-1][1])
+        with self.assertRaises(KeyError):
+            post_a("perinfo.exe/index", {})
+
+
+    def test_expired_session(self):
+        post = self._connect("a")
+        encoded = P._encode_credentials("a", "")[0]
+        self.adapter.expire.add(encoded)
+        r = post("perinfo.exe/schedule", {"Direc": "2"})
+        self.assertEqual(r.text, "page")
+        self.assertEqual(self.adapter.logins, [encoded, encoded])
+        schedule = [X for X in self.adapter.requests if "schedule" in X[1]]
+        self.assertEqual(len(schedule), 2) #repeated after logging in again
+
+
+    def test_idle_eviction(self):
+        post = self._connect("a")
+        later = time.monotonic() + 61
+        with mock.patch.object(P.time, "monotonic", return_value=later):
+            self.pool.evict_idle()
+        self.assertEqual(self.pool.sessions, {})
+        self.assertIn("LOGOUT", self.adapter.requests[-1][1])
+        #credentials are kept, so the next request logs in again
+        self.assertEqual(post("perinfo.exe/index", {}).text, "page")
+        self.assertEqual(len(self.adapter.logins), 2)
+
+
+    def test_close(self):
+        self._connect("a")
+        self._connect("b")
+        self.pool.close()
+        logouts = [X for X in self.adapter.requests if "LOGOUT" in X[1]]
+        self.assertEqual(len(logouts), 2)
+        self.assertEqual(self.pool.sessions, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
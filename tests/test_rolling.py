@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+
+import unittest
+import random
+import datetime as DT
+
+import aimslib.analytics.rolling as rolling
+from aimslib.common.types import Duty, Sector, SectorFlags, TripID
+import nightflight.night as nightcalc
+from nightflight.airport_nvecs import airfields as nvecs
+
+
+def _overlap(start, end, window_start, window_end):
+    latest_start, earliest_end = max(start, window_start), min(end, window_end)
+    return max((earliest_end - latest_start).total_seconds() // 60, 0)
+
+
+class TestRolling(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(42)
+        self.duties = []
+        date = DT.datetime(2019, 1, 1)
+        for c in range(120):
+            date += DT.timedelta(hours=random.randint(12, 60),
+                                 minutes=random.randint(0, 59))
+            sectors = []
+            off = date + DT.timedelta(minutes=60)
+            for s in range(random.randint(0, 3)):
+                on = off + DT.timedelta(minutes=random.randint(50, 240))
+                flags = random.choice(
+                    [SectorFlags.NONE] * 4 +
+                    [SectorFlags.POSITIONING, SectorFlags.QUASI])
+                act = random.random() < 0.8
+                sectors.append(Sector(
+                    str(6000 + s), "BRS", "FNC", off, on,
+                    off + DT.timedelta(minutes=5) if act else None,
+                    on + DT.timedelta(minutes=3) if act else None,
+                    "G-EZAA", "320", flags, None))
+                off = on + DT.timedelta(minutes=45)
+            finish = off + DT.timedelta(minutes=30)
+            self.duties.append(
+                Duty(TripID(str(c), ""), date, finish, sectors))
+            date = finish
+        self.duties.append(Duty(TripID("x", ""), None, None, None))
+
+    def _flown(self):
+        for duty in self.duties:
+            for sector in duty.sectors or ():
+                if sector.flags == SectorFlags.NONE:
+                    yield sector
+
+    def test_against_naive(self):
+        first, last = DT.date(2019, 1, 20), DT.date(2019, 6, 1)
+        results = rolling.rolling_totals(self.duties, (1, 7, 28),
+                                         first, last, night=False)
+        for window, totals in results.items():
+            self.assertEqual(len(totals.days), (last - first).days + 1)
+            for k, day in enumerate(totals.days.tolist()):
+                window_end = DT.datetime.combine(
+                    day + DT.timedelta(days=1), DT.time())
+                window_start = window_end - DT.timedelta(days=window)
+                duty = sum(_overlap(X.start, X.finish,
+                                    window_start, window_end)
+                           for X in self.duties if X.start)
+                block, sectors = 0, 0
+                for sector in self._flown():
+                    start, end = rolling._sector_times(sector)
+                    block += _overlap(start, end, window_start, window_end)
+                    if window_start <= start < window_end:
+                        sectors += 1
+                self.assertEqual(totals.duty[k], duty)
+                self.assertEqual(totals.block[k], block)
+                self.assertEqual(totals.sectors[k], sectors)
+                self.assertEqual(totals.night[k], 0)
+
+    def test_night_and_default_range(self):
+        totals = rolling.daily_totals(self.duties)
+        self.assertEqual(totals.days[0], self.duties[0].start.date())
+        self.assertEqual(totals.days[-1], self.duties[-2].finish.date())
+        expected = sum(
+            nightcalc.night_duration(nvecs["BRS"], nvecs["FNC"],
+                                     *rolling._sector_times(X))
+            for X in self._flown())
+        self.assertAlmostEqual(totals.night.sum(), expected)
+        self.assertEqual(totals.duty.sum(),
+                         sum((X.finish - X.start).total_seconds() // 60
+                             for X in self.duties if X.start))
+
+    def test_no_duties(self):
+        with self.assertRaises(ValueError):
+            rolling.daily_totals([])
+        totals = rolling.daily_totals([], DT.date(2019, 1, 1),
+                                      DT.date(2019, 1, 3))
+        self.assertEqual(totals.duty.tolist(), [0, 0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+
+import unittest
+import datetime as DT
+
+from aimslib.common.tables import SectorTable, DutyTable
+from aimslib.common.types import Sector, SectorFlags, Duty, TripID
+
+
+def _sector(name, day, crewlist_id=None, flags=SectorFlags.NONE):
+    start = DT.datetime(2019, 10, day, 6, 34)
+    finish = DT.datetime(2019, 10, day, 9, 45)
+    return Sector(name, "BRS", "FNC", start, finish, start, finish,
+                  "G-EZAA", "320", flags, crewlist_id)
+
+
+class TestTables(unittest.TestCase):
+
+    def setUp(self):
+        standby = Sector("ADTY", None, None,
+                         DT.datetime(2019, 10, 23, 5, 0),
+                         DT.datetime(2019, 10, 23, 13, 0),
+                         None, None, None, None,
+                         SectorFlags.QUASI | SectorFlags.GROUND_DUTY, None)
+        self.duties = [
+            Duty(TripID("14538", "17171"),
+                 DT.datetime(2019, 10, 21, 5, 30),
+                 DT.datetime(2019, 10, 21, 14, 29),
+                 [_sector("6245", 21, "201910216245~"),
+                  _sector("6246", 21, "201910216246~")]),
+            Duty(("14539", ""), None, None, None),
+            Duty(TripID("14540", ""), standby.sched_start,
+                 standby.sched_finish, (standby,)),
+            Duty(TripID("14541", "17172"),
+                 DT.datetime(2019, 10, 24, 5, 30),
+                 DT.datetime(2019, 10, 24, 14, 29),
+                 [_sector("6247", 24, "201910246247~",
+                          SectorFlags.POSITIONING)]),
+        ]
+
+    def test_sector_round_trip(self):
+        sectors = [X for D in self.duties for X in D.sectors or ()]
+        table = SectorTable(sectors)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(list(table), sectors)
+        self.assertEqual(table[-1], sectors[-1])
+        self.assertEqual(list(table[1:3]), sectors[1:3])
+        self.assertEqual(list(table[::2]), sectors[::2])
+        self.assertIn(sectors[2], table)
+        with self.assertRaises(IndexError):
+            table[4]
+
+    def test_duty_round_trip(self):
+        table = DutyTable(self.duties)
+        self.assertEqual(list(table), self.duties)
+        self.assertIsInstance(table[2].sectors, tuple)
+        self.assertIsInstance(table[0].sectors, list)
+        self.assertEqual(len(table.sectors), 4)
+        for slice_ in (slice(1, 3), slice(2, None), slice(None, None, 2),
+                       slice(3, 1), slice(-1, None)):
+            self.assertEqual(list(table[slice_]), self.duties[slice_])
+        self.assertEqual(list(table[1:][1:]), self.duties[2:])
+
+    def test_columns(self):
+        table = DutyTable(self.duties)
+        self.assertEqual(table.column("start")[0],
+                         int(DT.datetime(2019, 10, 21, 5, 30).replace(
+                             tzinfo=DT.timezone.utc).timestamp()) // 60)
+        self.assertEqual(table.sectors.column("act_start")[2], -2 ** 31)
+        with self.assertRaises(KeyError):
+            table.sectors.column("name")
+
+    def test_bad_datetime(self):
+        sector = _sector("6245", 21)._replace(
+            act_start=DT.datetime(2019, 10, 21, 6, 34, 10))
+        with self.assertRaises(ValueError):
+            SectorTable([sector])
+
+
+if __name__ == "__main__":
+    unittest.main()
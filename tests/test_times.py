@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+
+import unittest
+import itertools
+import datetime as dt
+
+import aimslib.common.times as times
+
+
+def strptime(s, format_):
+    try:
+        return dt.datetime.strptime(s, format_).time()
+    except ValueError:
+        return None
+
+
+def candidates(alphabet, max_len):
+    for length in range(max_len + 1):
+        for chars in itertools.product(alphabet, repeat=length):
+            yield "".join(chars)
+
+
+class TestTimes(unittest.TestCase):
+
+    def test_hm_matches_strptime(self):
+        for s in candidates("0123456789:", 5):
+            self.assertEqual(times.hm(s), strptime(s, "%H:%M"), s)
+
+    def test_hhmm_matches_strptime(self):
+        for s in candidates("0123456789", 5):
+            self.assertEqual(times.hhmm(s), strptime(s, "%H%M"), s)
+
+    def test_not_times(self):
+        for s in ("", "BRS", "(320)", " 1:00", "1:00 ", "12:345", "1200+1"):
+            self.assertIsNone(times.hm(s))
+        self.assertIsNone(times.hhmm("1:00"))
+
+    def test_non_ascii_digits(self):
+        #strptime accepts some, but not all, non-ASCII digits
+        for s in ("12:3\uff14", "1:\uff13", "\uff11\uff12:34", "\u0661:00"):
+            self.assertEqual(times.hm(s), strptime(s, "%H:%M"), s)
+        self.assertEqual(times.hm_delta("12:3\uff14"),
+                         dt.timedelta(hours=12, minutes=34))
+
+    def test_hm_delta(self):
+        self.assertEqual(times.hm_delta("24:00"), dt.timedelta(days=1))
+        self.assertEqual(times.hm_delta("0:05"), dt.timedelta(minutes=5))
+        self.assertEqual(times.hm_delta("23:59"),
+                         dt.timedelta(hours=23, minutes=59))
+        self.assertIsNone(times.hm_delta("24:01"))
+        self.assertIsNone(times.hm_delta("D/O"))
+
+    def test_hhmm_delta(self):
+        self.assertEqual(times.hhmm_delta("0615"),
+                         dt.timedelta(hours=6, minutes=15))
+        self.assertEqual(times.hhmm_delta("0615+0"),
+                         dt.timedelta(hours=6, minutes=15))
+        self.assertEqual(times.hhmm_delta("2350+1"),
+                         dt.timedelta(days=1, hours=23, minutes=50))
+        for s in ("615", "615+1", "0615+", "0615+x", "2400", "06:15"):
+            self.assertIsNone(times.hhmm_delta(s), s)
+
+
+if __name__ == "__main__":
+    unittest.main()
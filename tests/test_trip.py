@@ -116,6 +116,34 @@ class TestTripParsing(unittest.TestCase):
                 "</body></html>")
 
 
+    def test_parse_backends_agree(self):
+        html = """\
+<html><body><table><tr><td>Header</td></tr>
+<tr class="mono_rows_ctrl_f3" id="14262,1,14262,401,brs,1, ,gla,320">
+<td>401 BRS GLA 0855 1010 <b>A0900</b> A1009 OE-IVK 1:09 </td></tr>
+<tr class="sub_table_header_blue_courier"><td> 17:00 Rest
+<table><tr class="mono_rows_ctrl_f3"><td>Nested row</td></tr></table>
+</td></tr>
+<!-- comment -->
+<tr class="mono_rows_ctrl_f3" id="14262,1,14263,402,gla,1, ,brs,320">
+<td>402 GLA BRS 1035 1145 A1040 A1145 OE-IVK 1:05 11:45 </td></tr>
+</table>
+<table><tr class="mono_rows_ctrl_f3"><td>Other table</td></tr></table>
+</body></html>
+"""
+        expected = [
+            [['14262,1,14262,401,brs,1, ,gla,320',
+              '401', 'BRS', 'GLA', '0855', '1010',
+              'A0900', 'A1009', 'OE-IVK', '1:09']],
+            [['14262,1,14263,402,gla,1, ,brs,320',
+              '402', 'GLA', 'BRS', '1035', '1145',
+              'A1040', 'A1145', 'OE-IVK', '1:05', '11:45']]]
+        self.assertEqual(Trip.parse(html), expected)
+        self.assertEqual(Trip.parse(html, backend="bs4"), expected)
+        with self.assertRaises(BadTripDetails):
+            Trip.parse("Not even html", backend="bs4")
+
+
 class TestSectorProcessing(unittest.TestCase):
 
     def test_flight_sector_future(self):